@@ -0,0 +1,135 @@
+"""
+Async read paths for the element and isotope endpoints.
+
+Under ASGI (see ``elements/asgi.py``) plain JSON list and retrieve requests
+are answered from the in-memory snapshot or with async ORM queries, so a
+slow client does not hold a worker thread. Anything else - writes, the
+browsable API, other formats, `?expand=`, pagination or invalid filters - is
+handed to the DRF viewset, whose responses these match byte for byte.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+import django_filters.rest_framework as filters
+from rest_framework.renderers import JSONRenderer
+
+from api import metrics
+from api.cache import lookup_response, normalise_query, response_cache
+from api.snapshot import current_snapshot, filter_lookups, get_snapshot, model_fields
+from api.views import ElementViewSet, IsotopeViewSet
+
+# router mappings of the viewset actions behind list and detail URLs
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {'get': 'retrieve', 'put': 'update',
+                  'patch': 'partial_update', 'delete': 'destroy'}
+
+
+class AsyncReadView(View):
+    """
+    Serve GET list (no `pk`) and retrieve requests for `viewset` without
+    blocking, delegating every other request to the viewset itself.
+    """
+    viewset = None
+    # query parameters only the viewset knows how to answer
+    delegated_params = frozenset({'format', 'expand', 'cursor', 'page_size'})
+    renderer = JSONRenderer()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.list_view = staticmethod(cls.viewset.as_view(LIST_ACTIONS))
+        cls.detail_view = staticmethod(cls.viewset.as_view(DETAIL_ACTIONS))
+        cls.filterset_class = filters.DjangoFilterBackend().get_filterset_class(
+            cls.viewset, cls.viewset.queryset)
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # the viewset enforces CSRF itself for session-authenticated writes
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def delegate(self, request, pk=None):
+        if pk is None:
+            return await sync_to_async(self.list_view)(request)
+        return await sync_to_async(self.detail_view)(request, pk=pk)
+
+    post = put = patch = delete = options = delegate
+
+    def accepts_json(self, request):
+        accept = request.headers.get('Accept', '').strip()
+        return accept in ('', '*/*', 'application/json') and \
+            self.delegated_params.isdisjoint(request.GET)
+
+    async def get(self, request, pk=None):
+        if not self.accepts_json(request):
+            return await self.delegate(request, pk)
+
+        # keyed as by CachedResponseMixin, so both paths share renderings
+        key = (request.path, normalise_query(request.GET), 'application/json')
+        response, key, headers = lookup_response(request, key)
+        if response is None:
+            try:
+                data = await self.get_data(request, pk)
+            except DjangoValidationError:
+                return await self.delegate(request, pk)
+            if data is None:
+                model = self.viewset.queryset.model
+                data, status = {'detail': f"No {model._meta.object_name} "
+                                          "matches the given query."}, 404
+            else:
+                status = 200
+            response = HttpResponse(self.renderer.render(data), status=status,
+                                    content_type='application/json')
+            if status == 200:
+                response_cache.set(key, (response.content, response['Content-Type']))
+        for name, value in headers.items():
+            response[name] = value
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+    async def get_data(self, request, pk=None):
+        """
+        Records for a list request, or the record for `pk` (None if there is
+        none). Raises ValidationError for filters the viewset should report.
+        """
+        model = self.viewset.queryset.model
+        fields = request.GET.get('fields')
+        fields = set(fields.split(',')) if fields else None
+        if pk is not None:
+            try:
+                pk = model._meta.pk.to_python(pk)
+            except DjangoValidationError:
+                return None
+        else:
+            filterset = self.filterset_class(request.GET, queryset=self.viewset.queryset)
+            if not filterset.is_valid():
+                raise DjangoValidationError(filterset.errors)
+
+        if settings.API_SNAPSHOT:
+            snapshot = current_snapshot() or await sync_to_async(get_snapshot)()
+            table = snapshot.table(model)
+            if pk is not None:
+                row = table.get(pk)
+                return None if row is None else table.records([row], fields)[0]
+            with metrics.timed('filter'):
+                rows = table.filter(filter_lookups(filterset))
+            return table.records(rows, fields)
+
+        serializer_class = self.viewset.serializer_class
+        if fields is not None:
+            serializer_class = serializer_class.for_fields(fields)
+        columns = model_fields(serializer_class)
+        if pk is not None:
+            return await self.viewset.queryset.filter(pk=pk).values(*columns).afirst()
+        return [record async for record in filterset.qs.values(*columns)]
+
+
+class ElementReadView(AsyncReadView):
+    viewset = ElementViewSet
+
+
+class IsotopeReadView(AsyncReadView):
+    viewset = IsotopeViewSet
@@ -0,0 +1,238 @@
+"""
+Benchmarking helpers: a synthetic full-size dataset, in-process request
+measurements for every API read path, comparison against a baseline run,
+and closed-loop HTTP load generation against running servers.
+"""
+import asyncio
+import itertools
+import time
+import tracemalloc
+
+import numpy as np
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.cache import response_cache
+from api.models import SYMBOLS, Element, Isotope
+
+# last atomic number of each period
+PERIOD_ENDS = (2, 10, 18, 36, 54, 86, 118)
+
+
+def element_position(atomic_number):
+    """(period, group) of an element; f-block elements have no group (None)."""
+    period = next(i for i, end in enumerate(PERIOD_ENDS, start=1) if atomic_number <= end)
+    start = PERIOD_ENDS[period - 2] + 1 if period > 1 else 1
+    offset = atomic_number - start
+    length = PERIOD_ENDS[period - 1] - start + 1
+    if length == 2:
+        return period, 1 if offset == 0 else 18
+    if length == 8:
+        return period, offset + 1 if offset < 2 else offset + 11
+    if length == 18:
+        return period, offset + 1
+    if 2 <= offset < 16:
+        return period, None
+    return period, offset + 1 if offset < 2 else offset - 13
+
+
+def fixture_elements(isotopes_per_element=20):
+    """
+    Synthetic `elements.json` content for all 118 elements, with values in
+    the formats of the real data so parsing is exercised too.
+    """
+    elements = {}
+    for z, symbol in enumerate(SYMBOLS, start=1):
+        period, group = element_position(z)
+        mass = 2.5 * z + 0.0123 * z % 1
+        isotopes = {}
+        for i in range(isotopes_per_element):
+            mass_number = max(z, round(mass)) - isotopes_per_element // 2 + i
+            if mass_number < z:
+                continue
+            isotopes[f"{mass_number}{symbol}"] = {
+                "abundance": 1 / isotopes_per_element if i % 4 == 0 else None,
+                "discovered": 1900 + (z + i) % 120,
+                "atomic_mass": f"{mass_number + 0.00012 * i:.8f} ± 0.00000003",
+                "halflife": "Stable" if i % 4 == 0 else f"{i + 1}.{z % 10} s",
+                "decay_modes": "IS=100%" if i % 4 == 0 else "B-=100%",
+            }
+        elements[str(z)] = {
+            "symbol": symbol, "name": f"Element {z}", "period": str(period),
+            "group": str(group or ''), "atomic_weight": f"{mass:.4f}({z % 9 + 1})",
+            "density": f"{0.5 + z % 22:.3f} g/cm³",
+            "melting_point": f"{100 + 31 * z % 3500:.2f} K",
+            "boiling_point": f"{(200 + 47 * z % 5800) - 273.15:.2f} °C",
+            "covalent_atomic_radius": str(30 + 7 * z % 250),
+            "empirical_atomic_radius": f"{25 + 11 * z % 260} pm",
+            "van_der_waals_atomic_radius": f"{110 + 13 * z % 240} pm",
+            "pauling_scale_electronegativity": 0.7 + z % 33 / 10,
+            "allen_scale_electronegativity": 0.6 + z % 37 / 10,
+            "electron_affinity": f"{z % 29 / 8:.3f} eV",
+            "first_ionisation_energy": f"{3.9 + z % 21:.3f} eV",
+            "electron_configuration": "", "ground_level": "",
+            "year_discovered": 1700 + 3 * z % 320,
+            "oxidation_states": [f"+{1 + z % 4}", f"-{1 + z % 2}"],
+            "isotopes": isotopes,
+        }
+    return elements
+
+
+def filter_cases(viewset):
+    """
+    `(name, query string)` for every lookup in the viewset's
+    `filterset_fields`, with values sampled from the database so each one
+    selects some rows.
+    """
+    model = viewset.queryset.model
+    for field, lookups in viewset.filterset_fields.items():
+        values = sorted(model.objects.exclude(**{f'{field}__isnull': True})
+                        .values_list(field, flat=True).distinct())
+        if not values:
+            continue
+        low, high = values[len(values) // 4], values[len(values) // 2]
+        for lookup in lookups:
+            name = field if lookup == 'exact' else f'{field}__{lookup}'
+            value = {'in': f'{low},{high}', 'range': f'{low},{high}',
+                     'lte': high}.get(lookup, low)
+            yield name, f'{name}={value}'
+
+
+def api_cases():
+    """`(name, url)` for the element and isotope read paths to benchmark."""
+    from api.views import ElementViewSet, IsotopeViewSet
+
+    element = Element.objects.order_by('atomic_number').values_list('pk', flat=True)
+    isotope = Isotope.objects.order_by('pk').values_list('pk', flat=True)
+    for prefix, viewset, pk, fields in (
+            ('elements', ElementViewSet, element[len(element) // 2], 'symbol,atomic_mass'),
+            ('isotopes', IsotopeViewSet, isotope[len(isotope) // 2], 'isotope,abundance')):
+        yield f'{prefix}-list', f'/api/{prefix}/'
+        yield f'{prefix}-retrieve', f'/api/{prefix}/{pk}/'
+        yield f'{prefix}-fields', f'/api/{prefix}/?fields={fields}'
+        for name, query in filter_cases(viewset):
+            yield f'{prefix}-filter-{name}', f'/api/{prefix}/?{query}'
+
+
+def measure_request(client, url, requests=100, warmup=5, cached=False):
+    """
+    Time `requests` GETs of `url` (clearing the response cache before each
+    unless `cached`) and report throughput, latency percentiles in ms, and,
+    from one more request, its SQL query count, peak traced memory and size.
+    """
+    for _ in range(warmup):
+        client.get(url)
+    latencies = []
+    for _ in range(requests):
+        if not cached:
+            response_cache.clear()
+        start = time.perf_counter()
+        response = client.get(url)
+        latencies.append(time.perf_counter() - start)
+
+    if not cached:
+        response_cache.clear()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50, p95, p99 = (np.percentile(latencies, [50, 95, 99]) * 1000).tolist()
+    return {'url': url, 'status': response.status_code, 'requests': requests,
+            'rps': requests / sum(latencies), 'mean_ms': 1000 * float(np.mean(latencies)),
+            'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+            'queries': len(queries), 'peak_kib': peak / 1024,
+            'bytes': len(response.content)}
+
+
+def compare(results, baseline, max_ratio=2.0, metric='p50_ms'):
+    """
+    Return `(name, metric, old, new)` for every case in both runs whose
+    `metric` grew by more than `max_ratio` times, or that runs more queries.
+    """
+    old_results = {case['name']: case for case in baseline['results']}
+    regressions = []
+    for case in results:
+        old = old_results.get(case['name'])
+        if old is None:
+            continue
+        if case.get(metric) and old.get(metric) and case[metric] > max_ratio * old[metric]:
+            regressions.append((case['name'], metric, old[metric], case[metric]))
+        if case.get('queries', 0) > old.get('queries', 0):
+            regressions.append((case['name'], 'queries', old['queries'], case['queries']))
+    return regressions
+
+
+async def _request(reader, writer, host, path):
+    """Send a keep-alive GET; return (status, whether the server closes)."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+                 "Accept: application/json\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while (size := int((await reader.readline()).split(b';')[0], 16)):
+            await reader.readexactly(size + 2)
+        await reader.readline()  # end of (empty) trailers
+    else:
+        await reader.read()
+        return status, True
+    return status, headers.get('connection') == 'close'
+
+
+async def _client(host, port, paths, deadline, latencies, errors):
+    reader = writer = None
+    for path in paths:
+        if time.perf_counter() >= deadline:
+            break
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            start = time.perf_counter()
+            status, close = await _request(reader, writer, host, path)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            errors.append(None)
+            close = True
+        if close and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _run(host, port, paths, clients, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        # stagger the paths so every one is in flight at once
+        _client(host, port, itertools.islice(itertools.cycle(paths), i % len(paths), None),
+                deadline, latencies, errors)
+        for i in range(clients)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def run_load(host, port, paths, clients=100, duration=10.0):
+    """
+    Keep `clients` connections each sending GET requests for `paths` in
+    turn, back to back, for `duration` seconds. Return the number of
+    responses and of errors (HTTP >= 400 or connection failures), the
+    throughput and the p50/p99 latencies in milliseconds.
+    """
+    latencies, errors, elapsed = asyncio.run(_run(host, port, paths, clients, duration))
+    p50, p99 = (np.percentile(latencies, [50, 99]) * 1000).tolist() \
+        if latencies else (None, None)
+    return {'clients': clients, 'requests': len(latencies), 'errors': len(errors),
+            'rps': len(latencies) / elapsed, 'p50_ms': p50, 'p99_ms': p99}
@@ -0,0 +1,117 @@
+"""Bounded LRU caches of rendered API responses and computed results."""
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from api import dataset
+
+
+class LRUCache:
+    """
+    Thread-safe LRU mapping bounded by `maxsize` entries, or by the value of
+    the `setting` named by the class if no size is given.
+    """
+    setting = None
+
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = None
+
+    @property
+    def maxsize(self):
+        if self._maxsize is not None:
+            return self._maxsize
+        return getattr(settings, self.setting)
+
+    def sync(self, version):
+        """Drop every entry if the dataset version has changed."""
+        if version != self.version:
+            with self._lock:
+                self._entries.clear()
+                self.version = version
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ResponseCache(LRUCache):
+    """LRU mapping of cache keys to rendered response bodies."""
+    setting = 'API_RESPONSE_CACHE_SIZE'
+
+
+response_cache = ResponseCache()
+
+
+def normalise_query(query_params):
+    """
+    Canonical, hashable form of `query_params`: parameters sorted by name and
+    the ``fields`` projection sorted and de-duplicated, as its order does not
+    affect the rendered output.
+    """
+    normalised = []
+    for name in sorted(query_params):
+        values = query_params.getlist(name)
+        if name == 'fields':
+            values = [",".join(sorted({field for value in values
+                                       for field in value.split(',')
+                                       if field}))]
+        normalised.append((name, tuple(values)))
+    return tuple(normalised)
+
+
+def make_etag(version, key):
+    """Strong ETag for the representation identified by `key`."""
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+    return f'"{version:x}-{digest}"'
+
+
+def lookup_response(request, key):
+    """
+    Return ``(response, versioned_key, headers)`` for the representation
+    identified by `key`: a 304 or previously rendered response if there is
+    one (else None), the key to cache a fresh rendering under, and the
+    ETag/Last-Modified headers every response for it should carry.
+    """
+    version = dataset.version()
+    response_cache.sync(version)
+    etag = make_etag(version, key)
+    last_modified = version // 10**9 or None
+    headers = {'ETag': etag}
+    if last_modified:
+        headers['Last-Modified'] = http_date(last_modified)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        cached = response_cache.get((version, key))
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+    return response, (version, key), headers
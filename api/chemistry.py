@@ -0,0 +1,233 @@
+"""Chemical formula parsing, molar masses and isotopic patterns."""
+import functools
+import re
+
+import numpy as np
+
+from api import dataset
+from api.models import ATOMIC_NUMBERS, Element, Isotope
+
+TOKEN_RE = re.compile(r'''
+    \[(?P<mass_number>\d+)(?P<labelled>[A-Z][a-z]?)\]   # isotope label, e.g. [13C]
+  | (?P<symbol>[A-Z][a-z]?)
+  | (?P<count>\d+)
+  | (?P<open>[(\[{])
+  | (?P<close>[)\]}])
+''', re.VERBOSE)
+HYDRATE_RE = re.compile(r'\s*[·•.*]\s*')
+MULTIPLIER_RE = re.compile(r'^(\d*)(.*)$')
+BRACKETS = {'(': ')', '[': ']', '{': '}'}
+
+
+class FormulaError(ValueError):
+    """Raised when a chemical formula cannot be parsed."""
+
+
+def _parse_group(formula):
+    stack = [({}, None)]
+    counts = stack[0][0]
+    last = None  # counts of the most recent atom or closed group
+    pos = 0
+    while pos < len(formula):
+        match = TOKEN_RE.match(formula, pos)
+        if match is None:
+            raise FormulaError(f"Unexpected {formula[pos]!r} at position {pos}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind == 'symbol' or kind == 'labelled':
+            symbol = match.group(kind)
+            if symbol not in ATOMIC_NUMBERS:
+                raise FormulaError(f"Unknown element {symbol!r}")
+            species = symbol
+            if kind == 'labelled':
+                species = f"{int(match.group('mass_number'))}{symbol}"
+            counts[species] = counts.get(species, 0) + 1
+            last = {species: 1}
+        elif kind == 'count':
+            if last is None:
+                raise FormulaError(f"Count without element at position {match.start()}")
+            extra = int(match.group(kind)) - 1
+            for species, n in last.items():
+                counts[species] += n * extra
+            last = None
+        elif kind == 'open':
+            counts = {}
+            stack.append((counts, BRACKETS[match.group(kind)]))
+            last = None
+        else:
+            group, closing = stack.pop() if len(stack) > 1 else (None, None)
+            if closing != match.group(kind):
+                raise FormulaError(f"Unbalanced {match.group(kind)!r} at position {match.start()}")
+            counts = stack[-1][0]
+            for species, n in group.items():
+                counts[species] = counts.get(species, 0) + n
+            last = group
+    if len(stack) > 1:
+        raise FormulaError(f"Unclosed {stack[-1][1]!r}")
+    return counts
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_formula(formula):
+    """
+    Parse `formula` into a tuple of ``(species, count)`` pairs, where species
+    is an element symbol or an isotope label such as ``13C``. Parentheses,
+    ``[13C]`` labels and hydrates (``CuSO4·5H2O``, ``CuSO4.5H2O``) are
+    supported. Results are memoized.
+    """
+    formula = str(formula).replace(' ', '')
+    if not formula:
+        raise FormulaError("Empty formula")
+    total = {}
+    for part in HYDRATE_RE.split(formula):
+        multiplier, body = MULTIPLIER_RE.match(part).groups()
+        if not body:
+            raise FormulaError(f"Empty component in {formula!r}")
+        for species, count in _parse_group(body).items():
+            total[species] = total.get(species, 0) + count * int(multiplier or 1)
+    return tuple(sorted(total.items()))
+
+
+def convolve(a, b, threshold, resolution):
+    """
+    Combine two peak lists ``(masses, abundances)``, merging peaks that fall
+    in the same `resolution`-wide mass bin into their centroid and dropping
+    those below `threshold` relative to the most abundant one.
+    """
+    masses = np.add.outer(a[0], b[0]).ravel()
+    abundances = np.multiply.outer(a[1], b[1]).ravel()
+    keep = abundances >= threshold * abundances.max()
+    masses, abundances = masses[keep], abundances[keep]
+    _, inverse = np.unique(np.round(masses / resolution).astype(np.int64),
+                           return_inverse=True)
+    merged = np.bincount(inverse, weights=abundances)
+    centroids = np.bincount(inverse, weights=abundances * masses) / merged
+    return centroids, merged
+
+
+class MassTable:
+    """
+    Element and isotope masses indexed by species, plus the natural isotopic
+    abundance distribution of each element.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        species = list(Element.objects.order_by('atomic_number')
+                       .values_list('symbol', 'atomic_mass'))
+        isotopes = list(Isotope.objects.values_list(
+            'isotope', 'atomic_mass', 'element', 'abundance'))
+        species += [(label, mass) for label, mass, _, _ in isotopes]
+        self.index = {label: i for i, (label, _) in enumerate(species)}
+        self.labels = [label for label, _ in species]
+        self.masses = np.array([np.nan if mass is None else mass
+                                for _, mass in species], dtype=np.float64)
+        self.compile = functools.lru_cache(maxsize=65536)(self._compile)
+
+        natural = {}
+        for label, mass, element, abundance in isotopes:
+            if mass is not None and abundance:
+                natural.setdefault(element, []).append((mass, abundance))
+        self.distributions = {}
+        for element, peaks in natural.items():
+            masses, abundances = np.array(sorted(peaks)).T
+            self.distributions[element] = (masses, abundances / abundances.sum())
+        self.power = functools.lru_cache(maxsize=4096)(self._power)
+        self.pattern = functools.lru_cache(maxsize=4096)(self._pattern)
+
+    def _compile(self, formula):
+        """Species indices and counts of `formula` in this table."""
+        parsed = parse_formula(formula)
+        missing = [s for s, _ in parsed if s not in self.index]
+        if missing:
+            raise FormulaError(f"No mass data for {', '.join(missing)}")
+        return (tuple(self.index[species] for species, _ in parsed),
+                tuple(count for _, count in parsed))
+
+    def molar_masses(self, formulas, fractions=True):
+        """
+        Evaluate many formulas at once, returning one result dictionary per
+        formula with its `molar_mass` (and `mass_fractions`) or an `error`.
+        """
+        rows, indices, counts, errors = [], [], [], {}
+        for row, formula in enumerate(formulas):
+            try:
+                species, species_counts = self.compile(formula)
+            except FormulaError as err:
+                errors[row] = str(err)
+                continue
+            rows.extend([row] * len(species))
+            indices.extend(species)
+            counts.extend(species_counts)
+
+        rows = np.array(rows, dtype=np.intp)
+        indices = np.array(indices, dtype=np.intp)
+        contributions = np.array(counts, dtype=np.float64) * self.masses[indices]
+        totals = np.bincount(rows, weights=contributions, minlength=len(formulas))
+
+        results = [{'formula': formula, 'molar_mass': float(total)}
+                   for formula, total in zip(formulas, totals)]
+        for row, error in errors.items():
+            results[row] = {'formula': formulas[row], 'error': error}
+        for row in np.unique(rows[np.isnan(contributions)]):
+            results[row] = {'formula': formulas[row],
+                            'error': "Mass data is incomplete"}
+
+        if fractions and len(rows):
+            shares = (contributions / totals[rows]).tolist()
+            for row, index, share in zip(rows.tolist(), indices.tolist(), shares):
+                result = results[row]
+                if 'error' not in result:
+                    result.setdefault('mass_fractions', {})[self.labels[index]] = share
+        return results
+
+    def distribution(self, species):
+        """Peak list of a single atom of `species` (element or label)."""
+        if species in self.distributions:
+            return self.distributions[species]
+        if species not in ATOMIC_NUMBERS and species in self.index:
+            mass = self.masses[self.index[species]]
+            if not np.isnan(mass):
+                return np.array([mass]), np.array([1.0])
+        raise FormulaError(f"No isotopic abundance data for {species}")
+
+    def _power(self, species, count, threshold, resolution):
+        """Distribution of `count` atoms of `species` by repeated squaring."""
+        base = self.distribution(species)
+        result = (np.zeros(1), np.ones(1))
+        while count:
+            if count & 1:
+                result = convolve(result, base, threshold, resolution)
+            count >>= 1
+            if count:
+                base = convolve(base, base, threshold, resolution)
+        return result
+
+    def _pattern(self, formula, threshold, resolution):
+        result = (np.zeros(1), np.ones(1))
+        for species, count in parse_formula(formula):
+            result = convolve(result,
+                              self.power(species, count, threshold, resolution),
+                              threshold, resolution)
+        return result
+
+    def isotopic_pattern(self, formula, threshold=1e-6, resolution=1e-3):
+        """
+        Theoretical isotope peaks of `formula` as a list of ``{mass,
+        intensity}`` dictionaries, with intensities relative to the base peak.
+        Peaks below `threshold` are pruned at every convolution step and peaks
+        in the same `resolution`-wide bin (Da) are merged; ``resolution=1``
+        gives nominal mass peaks.
+        """
+        masses, abundances = self.pattern(formula, threshold, resolution)
+        intensities = abundances / abundances.max()
+        return [{'mass': mass, 'intensity': intensity}
+                for mass, intensity in zip(masses.tolist(), intensities.tolist())]
+
+
+_table = dataset.VersionedValue(MassTable)
+
+
+def get_mass_table():
+    """Return the mass table, rebuilding it when the dataset changes."""
+    return _table.get()
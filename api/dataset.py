@@ -0,0 +1,90 @@
+"""Version stamp for the periodic table dataset.
+
+The data only changes when ``populate_db`` runs or is written through the
+API, so a stamp file touched after each change lets every serving process cheaply detect that
+its cached view of the database has gone stale.
+
+A read-only artifact (``DATABASE_ARTIFACT``) instead carries its own build
+id, written by ``build_artifact`` and read once per process: connections to
+the artifact stay on the file that was opened first, so replacing it only
+takes effect, with a new version, after a restart.
+"""
+import functools
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+# table of build_artifact holding the artifact's version, in one row
+BUILD_TABLE = 'artifact_build'
+
+
+def version_file():
+    """Path of the stamp file shared by all processes."""
+    return settings.DATASET_VERSION_FILE
+
+
+@functools.cache
+def artifact_version(path):
+    """The build id stored in the artifact at `path` (0 if it has none)."""
+    try:
+        db = sqlite3.connect(f'file:{path}?mode=ro&immutable=1', uri=True)
+        try:
+            return db.execute(f'SELECT version FROM {BUILD_TABLE}').fetchone()[0]
+        finally:
+            db.close()
+    except (sqlite3.Error, TypeError):
+        return 0
+
+
+def version():
+    """Return the current dataset version (0 if never populated)."""
+    if settings.DATABASE_ARTIFACT:
+        return artifact_version(settings.DATABASE_ARTIFACT)
+    try:
+        return os.stat(version_file()).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def bump_version():
+    """Mark the dataset as changed and return the new version."""
+    path = version_file()
+    now = time.time_ns()
+    with open(path, 'w') as f:
+        f.write(f"{now}\n")
+    os.utime(path, ns=(now, now))
+    return os.stat(path).st_mtime_ns
+
+
+class VersionedValue:
+    """
+    A per-process value built by `build(version)` on first use and rebuilt
+    once the dataset version changes. Concurrent callers that find it stale
+    wait for a single rebuild instead of each building their own.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self._entry = None  # (version, value)
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the value if it is up to date, without building it."""
+        entry = self._entry
+        if entry is not None and entry[0] == version():
+            return entry[1]
+        return None
+
+    def get(self):
+        """Return the value for the current version, (re)building it if needed."""
+        current = version()
+        entry = self._entry
+        if entry is None or entry[0] != current:
+            with self._lock:
+                if self._entry is None or self._entry[0] != current:
+                    self._entry = (current, self.build(current))
+                entry = self._entry
+        return entry[1]
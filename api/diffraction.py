@@ -0,0 +1,137 @@
+"""Vectorized powder diffraction patterns of stored crystal structures.
+
+Every reflection (hkl) up to the 2θ cutoff is generated at once and its
+d-spacing, Bragg angle and structure factor are evaluated as array
+operations. Atomic scattering factors are approximated by the atomic number
+(their forward-scattering limit) and intensities include the
+Lorentz-polarisation factor. Reflections equivalent under the Laue group of
+the structure (its point group, as found by spglib, plus inversion) are
+merged into one peak with their multiplicity; inequivalent reflections that
+happen to coincide in angle, such as cubic (300) and (221), stay separate.
+"""
+import numpy as np
+import spglib
+
+from api.cache import LRUCache
+from api.models import ATOMIC_NUMBERS
+
+# Cu Kα1, in Å
+DEFAULT_WAVELENGTH = 1.5406
+# peaks weaker than this fraction of the strongest one are dropped
+MIN_INTENSITY = 1e-4
+
+
+class PatternCache(LRUCache):
+    """LRU mapping of (structure, wavelength, cutoff) to computed peaks."""
+    setting = 'API_DIFFRACTION_CACHE_SIZE'
+
+
+pattern_cache = PatternCache()
+
+
+class ReflectionLimitError(ValueError):
+    """Raised when a pattern would need more (hkl) candidates than allowed."""
+
+
+def reflections(reciprocal_vectors, d_min, max_candidates=None):
+    """
+    All (hkl) with d ≥ `d_min`, returned as ``(hkl, d)`` arrays. Raises
+    ReflectionLimitError if more than `max_candidates` (hkl) would have to be
+    generated to find them.
+    """
+    reciprocal = np.asarray(reciprocal_vectors, dtype=np.float64)
+    direct = 2 * np.pi * np.linalg.inv(reciprocal).T
+    # |h| = |G·a| / 2π ≤ |a| / d
+    limits = np.floor(np.linalg.norm(direct, axis=1) / d_min).astype(int)
+    candidates = int(np.prod(2 * limits.astype(object) + 1))
+    if max_candidates is not None and candidates > max_candidates:
+        raise ReflectionLimitError(
+            f"{candidates} (hkl) candidates exceed the limit of {max_candidates}; "
+            "use a longer wavelength or a lower max_two_theta")
+    ranges = [np.arange(-n, n + 1) for n in limits]
+    hkl = np.stack(np.meshgrid(*ranges, indexing='ij'), axis=-1).reshape(-1, 3)
+    g = np.linalg.norm(hkl @ reciprocal, axis=1)
+    keep = (g > 0) & (g <= 2 * np.pi / d_min)
+    return hkl[keep], 2 * np.pi / g[keep]
+
+
+def laue_rotations(reciprocal_vectors, atoms, symprec=1e-3):
+    """
+    The distinct rotations (in fractional coordinates) of the structure's
+    point group, found by spglib; just the identity if none is found.
+    """
+    reciprocal = np.asarray(reciprocal_vectors, dtype=np.float64)
+    lattice = 2 * np.pi * np.linalg.inv(reciprocal).T
+    positions = [atom[1:4] for atom in atoms]
+    numbers = [ATOMIC_NUMBERS.get(atom[0], 0) for atom in atoms]
+    symmetry = spglib.get_symmetry((lattice, positions, numbers), symprec=symprec)
+    if not symmetry:
+        return np.eye(3, dtype=int)[np.newaxis]
+    return np.unique(symmetry['rotations'], axis=0)
+
+
+def equivalence_keys(hkl, rotations):
+    """
+    For each (hkl), the index of the lexicographically largest reflection
+    equivalent to it under `rotations` and inversion (Friedel's law), in the
+    order of a grid of side ``2 * max|hkl| + 1``.
+    """
+    base = 2 * int(np.abs(hkl).max()) + 1
+    offset = base // 2
+    weights = np.array([base * base, base, 1])
+    keys = np.full(len(hkl), -1)
+    for rotation in rotations:
+        # Miller indices transform as row vectors: h' = h R
+        image = hkl @ rotation
+        for sign in (1, -1):
+            np.maximum(keys, (sign * image + offset) @ weights, out=keys)
+    return keys, base
+
+
+def powder_pattern(reciprocal_vectors, atoms, wavelength=DEFAULT_WAVELENGTH,
+                   max_two_theta=180.0, max_candidates=None):
+    """
+    Powder diffraction peaks up to `max_two_theta` degrees as a list of
+    ``{two_theta, d_spacing, intensity, hkl, multiplicity}`` dictionaries,
+    with intensities relative to the strongest peak (100). See
+    `reflections()` for `max_candidates`.
+    """
+    d_min = wavelength / (2 * np.sin(np.radians(min(max_two_theta, 180.0)) / 2))
+    hkl, d = reflections(reciprocal_vectors, d_min, max_candidates)
+    if not len(hkl) or not atoms:
+        return []
+
+    positions = np.array([atom[1:4] for atom in atoms], dtype=np.float64)
+    weights = np.array([ATOMIC_NUMBERS.get(atom[0], 0) * atom[4] for atom in atoms],
+                       dtype=np.float64)
+    structure_factors = np.exp(2j * np.pi * (hkl @ positions.T)) @ weights
+    theta = np.arcsin(np.clip(wavelength / (2 * d), -1, 1))
+    two_theta = np.degrees(2 * theta)
+    lorentz_polarisation = ((1 + np.cos(2 * theta) ** 2)
+                            / (np.sin(theta) ** 2 * np.cos(theta)))
+    intensities = np.abs(structure_factors) ** 2 * lorentz_polarisation
+
+    # merge equivalent reflections, labelled with the largest of them
+    keys, base = equivalence_keys(hkl, laue_rotations(reciprocal_vectors, atoms))
+    unique_keys, group = np.unique(keys, return_inverse=True)
+    labels = np.stack([unique_keys // (base * base), unique_keys // base % base,
+                       unique_keys % base], axis=1) - base // 2
+    totals = np.bincount(group, weights=intensities)
+    multiplicity = np.bincount(group)
+    peak_d = np.bincount(group, weights=d) / multiplicity
+    peak_two_theta = np.bincount(group, weights=two_theta) / multiplicity
+
+    if not totals.max() > 0:
+        return []
+    relative = 100 * totals / totals.max()
+    # by angle, then by label for peaks that coincide
+    order = np.lexsort((-labels[:, 2], -labels[:, 1], -labels[:, 0],
+                        np.round(peak_two_theta, 6)))
+    strong = order[relative[order] >= 100 * MIN_INTENSITY]
+    return [{'two_theta': t, 'd_spacing': s, 'intensity': i, 'hkl': h,
+             'multiplicity': m}
+            for t, s, i, h, m in zip(peak_two_theta[strong].tolist(),
+                                     peak_d[strong].tolist(),
+                                     relative[strong].tolist(),
+                                     labels[strong].tolist(),
+                                     multiplicity[strong].tolist())]
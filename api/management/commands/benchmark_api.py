@@ -0,0 +1,145 @@
+"""Benchmark ingestion and every element/isotope read path in process."""
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from api.benchmark import api_cases, compare, fixture_elements, measure_request
+from api.models import Element, Isotope
+
+
+class Command(BaseCommand):
+    help = ('Builds a fixture database from a synthetic full-size dataset, '
+            'times populate_db, then measures requests/s, latency percentiles, '
+            'SQL queries and peak memory of each element and isotope list, '
+            'retrieve, projection and filter; optionally failing on regressions '
+            'against a previous run')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100,
+                            help='timed requests per case')
+        parser.add_argument('--isotopes-per-element', type=int, default=20)
+        parser.add_argument('--cached', action='store_true',
+                            help='keep the response cache between requests')
+        parser.add_argument('--filter', default='',
+                            help='only run cases whose name contains this')
+        parser.add_argument('--output', help='write the results as JSON here')
+        parser.add_argument('--compare', metavar='BASELINE',
+                            help='JSON results of a previous run to compare with')
+        parser.add_argument('--max-ratio', type=float, default=2.0,
+                            help='fail if a p50 latency grows by more than this')
+
+    def populate(self, path, *args):
+        """Run `populate_db` into empty tables and return its duration."""
+        Isotope.objects.all().delete()
+        Element.objects.all().delete()
+        start = time.perf_counter()
+        call_command('populate_db', '--input', path, *args, verbosity=0,
+                     stdout=io.StringIO(), stderr=io.StringIO())
+        return time.perf_counter() - start
+
+    def measure_ingestion(self, path, *args):
+        """Time `populate_db`, then trace its peak memory in a second run."""
+        elapsed = self.populate(path, *args)
+        tracemalloc.start()
+        try:
+            self.populate(path, *args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {'seconds': elapsed, 'peak_kib': peak / 1024}
+
+    def run_cases(self, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'elements.json')
+            with open(path, 'w') as f:
+                json.dump(fixture_elements(options['isotopes_per_element']), f)
+            for name, args in (('populate_db', ()), ('populate_db-bulk', ('--bulk',))):
+                if options['filter'] in name:
+                    yield {'name': name, **self.measure_ingestion(path, *args)}
+            if not Element.objects.exists():
+                self.populate(path, '--bulk')
+
+        client = Client()
+        for name, url in api_cases():
+            if options['filter'] in name:
+                yield {'name': name, **measure_request(
+                    client, url, options['requests'], cached=options['cached'])}
+
+    def metadata(self, options):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                    cwd=settings.BASE_DIR, capture_output=True,
+                                    text=True).stdout.strip() or None
+        except OSError:
+            commit = None
+        return {'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'commit': commit, 'python': platform.python_version(),
+                'django': django.get_version(), 'machine': platform.machine(),
+                'snapshot': settings.API_SNAPSHOT, 'cached': options['cached'],
+                'requests': options['requests'],
+                'isotopes_per_element': options['isotopes_per_element']}
+
+    def report(self, case):
+        if 'url' not in case:
+            self.stdout.write(f"{case['name']:55} {case['seconds']:9.3f} s"
+                              f"{'':34}{case['peak_kib']:9.0f} KiB")
+        else:
+            self.stdout.write(
+                f"{case['name']:55} {case['rps']:9.1f}/s  p50 {case['p50_ms']:7.2f}  "
+                f"p99 {case['p99_ms']:7.2f} ms  {case['queries']:3} q "
+                f"{case['peak_kib']:9.0f} KiB")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as err:
+                raise CommandError(err)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        version_file = tempfile.NamedTemporaryFile(delete=False)
+        version_file.close()
+        try:
+            with override_settings(DATASET_VERSION_FILE=version_file.name):
+                results = []
+                for case in self.run_cases(options):
+                    results.append(case)
+                    self.report(case)
+        finally:
+            os.remove(version_file.name)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        run = {'metadata': self.metadata(options), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(run, f, indent=2)
+
+        if baseline is not None:
+            metric = 'p50_ms'
+            regressions = compare(results, baseline, options['max_ratio'], metric)
+            ingestion = compare([case for case in results if 'url' not in case],
+                                baseline, options['max_ratio'], 'seconds')
+            for name, metric, old, new in regressions + ingestion:
+                self.stderr.write(f"{name}: {metric} {old:.6g} -> {new:.6g}")
+            if regressions or ingestion:
+                raise CommandError(f"{len(regressions) + len(ingestion)} regression(s) "
+                                   f"against {options['compare']}")
+            self.stdout.write(f"No regressions against {options['compare']}")
@@ -0,0 +1,105 @@
+"""Compare WSGI and ASGI serving under many concurrent keep-alive clients."""
+import json
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import run_load
+
+DEFAULT_PATHS = ['/api/elements/', '/api/elements/26/',
+                 '/api/isotopes/?element=Fe', '/api/isotopes/56Fe/']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = ('Starts the project under gunicorn (WSGI) and uvicorn (ASGI) in '
+            'turn and reports throughput and p50/p99 latency for each number '
+            'of concurrent clients')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=['wsgi', 'asgi'],
+                            default=['wsgi', 'asgi'])
+        parser.add_argument('--clients', nargs='+', type=int,
+                            default=[100, 250, 500, 1000])
+        parser.add_argument('--duration', type=float, default=10,
+                            help='seconds of load per run')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='server processes')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='threads per gunicorn worker')
+        parser.add_argument('--path', dest='paths', action='append',
+                            help='URL requested in turn (repeatable)')
+        parser.add_argument('--json', action='store_true',
+                            help='print results as JSON')
+
+    def server_command(self, server, port, options):
+        if server == 'wsgi':
+            return [sys.executable, '-m', 'gunicorn', 'elements.wsgi:application',
+                    '--bind', f'127.0.0.1:{port}', '--worker-class', 'gthread',
+                    '--workers', str(options['workers']),
+                    '--threads', str(options['threads']),
+                    '--backlog', '2048', '--log-level', 'warning']
+        return [sys.executable, '-m', 'uvicorn', 'elements.asgi:application',
+                '--host', '127.0.0.1', '--port', str(port),
+                '--workers', str(options['workers']),
+                '--backlog', '2048', '--log-level', 'warning', '--no-access-log']
+
+    def wait_until_ready(self, process, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"Server exited with status {process.returncode}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError(f"Server did not listen on port {port} in {timeout}s")
+
+    def benchmark(self, server, options):
+        port = free_port()
+        process = subprocess.Popen(self.server_command(server, port, options),
+                                   cwd=settings.BASE_DIR)
+        try:
+            self.wait_until_ready(process, port)
+            run_load('127.0.0.1', port, options['paths'], clients=1, duration=1)
+            for clients in options['clients']:
+                result = run_load('127.0.0.1', port, options['paths'],
+                                  clients=clients, duration=options['duration'])
+                yield {'server': server, **result}
+        finally:
+            process.terminate()
+            process.wait()
+
+    def handle(self, *args, **options):
+        options['paths'] = options['paths'] or DEFAULT_PATHS
+        try:
+            import resource
+            # one descriptor per client connection
+            _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ImportError, ValueError, OSError):
+            pass
+
+        results = []
+        for server in options['servers']:
+            for result in self.benchmark(server, options):
+                results.append(result)
+                if not options['json']:
+                    self.stdout.write(
+                        f"{result['server']:4}  {result['clients']:5} clients  "
+                        f"{result['rps']:8.1f} req/s  "
+                        f"p50 {result['p50_ms'] or 0:8.1f} ms  "
+                        f"p99 {result['p99_ms'] or 0:8.1f} ms  "
+                        f"{result['errors']} errors")
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,69 @@
+"""Build the read-only database file served with `DATABASE_ARTIFACT`."""
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api import dataset
+
+
+class Command(BaseCommand):
+    help = ('Copies the populated database into a compacted, analysed SQLite '
+            'file that can be served read-only and immutable')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?',
+                            default=settings.DATABASE_ARTIFACT or
+                            os.path.join(settings.BASE_DIR, 'elements.sqlite3'),
+                            help='artifact to write (default: DATABASE_ARTIFACT)')
+
+    def optimise(self, path, version):
+        """
+        Stamp the copy with its build id, gather planner statistics and lay
+        the file out for read-only use.
+        """
+        db = sqlite3.connect(path, isolation_level=None)
+        try:
+            db.execute('PRAGMA journal_mode=DELETE')
+            db.execute(f'DROP TABLE IF EXISTS {dataset.BUILD_TABLE}')
+            db.execute(f'CREATE TABLE {dataset.BUILD_TABLE} (version INTEGER NOT NULL)')
+            db.execute(f'INSERT INTO {dataset.BUILD_TABLE} VALUES (?)', [version])
+            if db.execute("SELECT 1 FROM sqlite_master "
+                          "WHERE name = 'api_element_search'").fetchone():
+                # merge the full-text index into a single b-tree
+                db.execute("INSERT INTO api_element_search(api_element_search) "
+                           "VALUES ('optimize')")
+            db.execute('ANALYZE')
+            db.execute('VACUUM')
+            result = db.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            db.close()
+        if result != 'ok':
+            raise CommandError(f"Integrity check failed: {result}")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Artifacts can only be built from a SQLite database')
+        output = os.path.abspath(options['output'])
+        staging = f"{output}.tmp"
+        if os.path.exists(staging):
+            os.remove(staging)
+
+        start = time.perf_counter()
+        with connection.cursor() as cursor:
+            # a defragmented copy, consistent even while the source is read
+            cursor.execute('VACUUM INTO %s', [staging])
+        try:
+            self.optimise(staging, time.time_ns())
+        except BaseException:
+            os.remove(staging)
+            raise
+        # processes serving the old file keep its version until restarted
+        os.replace(staging, output)
+        elapsed = time.perf_counter() - start
+
+        size = os.path.getsize(output)
+        self.stdout.write(f"Wrote {output} ({size / 1024:.0f} KiB) in {elapsed:.2f}s")
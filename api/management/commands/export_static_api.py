@@ -0,0 +1,144 @@
+"""Render the read-only API into a tree of precompressed static files."""
+import gzip
+import json
+import os
+import re
+import shutil
+import time
+
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import resolve
+
+from api import dataset
+from api.models import Element, Isotope
+
+try:
+    import brotli
+except ImportError:  # optional, .br variants are skipped without it
+    brotli = None
+
+# field projections exported for each list endpoint besides the full records
+PROJECTIONS = {
+    'elements': ('atomic_number,name,symbol',
+                 'atomic_mass,atomic_number,symbol',
+                 'atomic_number,group,period,symbol'),
+    'isotopes': ('abundance,atomic_mass,isotope',
+                 'element,isotope,mass_number,neutrons'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Prebuild list, detail and common projection responses of the API '
+            'as static files with .gz/.br variants and an ETag manifest')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='static-api',
+                            help='symlink to the exported tree, swapped atomically '
+                                 'to each new export')
+        parser.add_argument('--projection', action='append', default=[],
+                            metavar='RESOURCE:FIELDS',
+                            help='extra projection to export, e.g. '
+                                 'elements:symbol,density_g_per_cm3')
+        parser.add_argument('--no-compress', action='store_true',
+                            help='skip writing .gz and .br variants')
+
+    def get_urls(self, projections):
+        """Canonical URLs of every response to export."""
+        urls = ['/api/elements/', '/api/isotopes/', '/api/elements/columns/']
+        urls += [f'/api/elements/{pk}/' for pk in
+                 Element.objects.order_by('pk').values_list('pk', flat=True)]
+        urls += [f'/api/isotopes/{pk}/' for pk in
+                 Isotope.objects.order_by('pk').values_list('pk', flat=True)]
+        for resource, fields in projections:
+            fields = ','.join(sorted(set(fields.split(','))))
+            urls.append(f'/api/{resource}/?{urlencode({"fields": fields}, safe=",")}')
+        return urls
+
+    def render(self, url):
+        """Render `url` through the API views, returning the response."""
+        request = self.factory.get(url, HTTP_ACCEPT='application/json')
+        match = resolve(request.path_info)
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        if response.status_code != 200:
+            raise CommandError(f"{url} returned {response.status_code}")
+        return response
+
+    @staticmethod
+    def file_path(url):
+        """Relative file path for `url`, e.g. api/elements/fields=name,symbol.json."""
+        path, _, query = url.partition('?')
+        return os.path.join(path.strip('/'), f"{query or 'index'}.json")
+
+    def write(self, directory, relative, content):
+        path = os.path.join(directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def publish(self, output, release):
+        """
+        Point the `output` symlink at `release` with a single rename, so
+        readers see either the previous tree or the new one, then remove
+        previous and abandoned exports.
+        """
+        if os.path.isdir(output) and not os.path.islink(output):
+            # a plain directory left by an older version; replaced once, non-atomically
+            shutil.rmtree(output)
+        link = f'{output}.link'
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(os.path.basename(release), link)
+        os.replace(link, output)
+
+        directory, name = os.path.split(output)
+        stale = re.compile(rf'{re.escape(name)}\.(\d+|tmp|old)')
+        for entry in os.listdir(directory):
+            path = os.path.join(directory, entry)
+            if stale.fullmatch(entry) and path != release:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def handle(self, *args, **options):
+        projections = [(resource, fields)
+                       for resource, all_fields in PROJECTIONS.items()
+                       for fields in all_fields]
+        for projection in options['projection']:
+            resource, _, fields = projection.partition(':')
+            if resource not in PROJECTIONS or not fields:
+                raise CommandError(f"Invalid projection {projection!r}, "
+                                   f"expected one of {', '.join(PROJECTIONS)}:FIELDS")
+            projections.append((resource, fields))
+        encoders = {}
+        if not options['no_compress']:
+            encoders['gzip'] = ('.gz', lambda data: gzip.compress(data, 9, mtime=0))
+            if brotli is not None:
+                encoders['br'] = ('.br', lambda data: brotli.compress(data, quality=11))
+            else:
+                self.stderr.write("brotli is not installed, skipping .br files")
+
+        output = os.path.abspath(options['output'])
+        # each export is written to its own directory next to the link
+        release = f'{output}.{time.time_ns()}'
+        self.factory = RequestFactory()
+
+        manifest = {'version': dataset.version(), 'files': {}}
+        for url in self.get_urls(projections):
+            response = self.render(url)
+            relative = self.file_path(url)
+            self.write(release, relative, response.content)
+            entry = {'path': relative, 'etag': response.get('ETag'),
+                     'content_type': response['Content-Type'],
+                     'size': len(response.content), 'encodings': {}}
+            for encoding, (suffix, compress) in encoders.items():
+                self.write(release, relative + suffix, compress(response.content))
+                entry['encodings'][encoding] = relative + suffix
+            manifest['files'][url] = entry
+        self.write(release, 'manifest.json',
+                   json.dumps(manifest, indent=2, sort_keys=True).encode())
+
+        self.publish(output, release)
+        self.stdout.write(f"Exported {len(manifest['files'])} responses to {output}")
@@ -1,61 +1,22 @@
 """A convenience wrapper for creating periodic table data with Django SQL ORM models.""" 
 import sys
-import re
-import os
 import json
-import numpy as np
+import time
 
-from pprint import pprint
 from tqdm import tqdm 
 
+from computedfields.models import update_computedfields
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from api import dataset, search
 from api.models import (
     Block, Element, Group, IonisationEnergies, Isotope,
-    Orbital, OxidationState, Period
+    Orbital, OxidationState, Period, block_of
 )
+from parsers.values import optional, parse_number, parse_quantities, split_unit
 
-def remove_brackets(x):
-    return re.sub(r'[\(\[][A-Za-z0-9 \.]{1,}[\)\]]', '', str(x))
-
-def remove_colon_phrase(x):
-    return re.sub(r'[A-Za-z]+:[ ]{0,}', '', str(x))
-
-def numeric_cast(x):
-    if isinstance(x, str):
-        try:
-            x = np.mean(eval(str(x)))
-        except SyntaxError:
-            x = eval(str(x))
-    return x
-
-
-def split_unit(x, value_cast=numeric_cast):
-    try:
-        value, unit, *_ = \
-            tuple(map(str.strip,
-                      re.sub(r'(â.*|\\x[0-9a-fA-f]{2}|~)', '',
-                             remove_colon_phrase(remove_brackets(x))).split()))
-    except ValueError as err:
-        try:
-            value, unit, *_ = x.partition('°C')
-            value = float(value)
-            if unit == '°C':
-                value, unit = (value - 272.16, 'K')
-        except ValueError:
-            print(f"Cannot split unit from {x!r} due to {err!r}", file=sys.stderr)
-            return None, None
-    try:
-        retval = value_cast("".join([ch for ch in str(value) if ch.isnumeric()])), unit
-    except SyntaxError:
-        try:
-            retval = float(value), unit
-        except ValueError as err:
-            print(f"Cannot convert {value!r} to float due to {err!r}", file=sys.stderr)
-            retval = None, None
-    except Exception as err:
-        print(f"Failed to cast {value!r} due to {err!r}", file=sys.stderr)
-        retval = value, unit
-    return retval
+# suffix of the Element field holding a property in the given unit
+UNIT_SUFFIXES = {'K': 'kelvin', 'pm': 'pm', 'eV': 'ev'}
 
 
 class Command(BaseCommand):
@@ -63,65 +24,131 @@ class Command(BaseCommand):
     args = '<foo bar ...>'  # TODO: fix this
     help = 'Populates database with periodic table data'  # TODO: 
 
-    def _create_elements(self):
-        elements = json.load(open('elements.json'))  # load from somewhere
-        progress = tqdm(tuple(elements.items()))
+    def add_arguments(self, parser):
+        parser.add_argument('--input', default='elements.json',
+                            help='JSON file of element data to load')
+        parser.add_argument('--bulk', action='store_true',
+                            help='parse everything first, then upsert in '
+                                 'batches inside a single transaction')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='rows per INSERT when using --bulk')
+
+    def _parse_element(self, num, element):
+        """
+        Convert an `elements.json` entry into an unsaved Element and its
+        Isotopes and OxidationStates.
+        """
+        d = {k: v for k, v in element.items()
+             if k not in ('isotopes', 'oxidation_states', 'about')
+             and not k.startswith('elemental_forms_')}
+        _data = {}
+        element_fields = {f.name for f in Element._meta.concrete_fields}
+        unitless_keys = ('van_der_waals_atomic_radius',
+                     'empirical_atomic_radius', 'covalent_atomic_radius',
+                     'melting_point', 'boiling_point', 'electron_affinity',
+                     'first_ionisation_energy')
+        for key in unitless_keys:
+            if key not in d:
+                continue  # skip as no such key
+            value, unit = split_unit(d.pop(key))
+            if value is None:
+                print(f"Cannot extract a value for {key!r} of {d.get('symbol')!r}",
+                      file=sys.stderr)
+                continue  # skip as data invalid
+            if unit is None and key.endswith('_radius'):
+                unit = 'pm'
+            field = f"{key}_{UNIT_SUFFIXES.get(unit)}"
+            if field in element_fields:
+                _data[field] = value
+
+        for key in ('period', 'group'):
+            _data[key] = int(parse_number(d.pop(key)) or 0) or -1
+
+        _data['atomic_mass'] = parse_number(d.pop('atomic_weight'))
+        density, unit = split_unit(d.pop('density', ''))
+        _data['density_g_per_cm3'] = density if unit in (None, 'g/cm³') else None
+        _data['uses'] = "\n".join(element.get('uses', '')) or None
+        _data['description'] = element.get('description', element.get('about', '')) or None
+
+        _data.update(**d)
+        _data.setdefault('block', block_of(int(num), _data['group']))
+
+        elem = Element(atomic_number=int(num), **_data)
+
+        raw_isotopes = element.get('isotopes', {})
+        masses, uncertainties, _ = parse_quantities(
+            [_data.get('atomic_mass') for _data in raw_isotopes.values()],
+            normalised=False)
+        isotopes = []
+        for i, (isotope, _data) in enumerate(raw_isotopes.items()):
+            _data = dict(_data)
+            _data['year_discovered'] = _data.pop('discovered', None) or None
+            _data['atomic_mass'] = optional(masses[i])
+            _data['atomic_mass_uncertainty'] = optional(uncertainties[i])
+            isotopes.append(Isotope(isotope, **_data))
+
+        states = {parse_number(state) for state in element.get('oxidation_states', ())}
+        oxidation_states = [OxidationState(element=elem, state=int(state))
+                            for state in sorted(states - {None})]
+
+        return elem, isotopes, oxidation_states
+
+    def _create_elements(self, elements):
+        progress = tqdm(tuple(elements.items()), disable=not self.verbosity)
+        count = 0
         for num, element in progress:
             progress.set_description(f"Processing Element: {element['symbol']}...")
-            d = {k: v for k, v in element.items()
-                 if k not in ('isotopes', 'oxidation_states', 'about')
-                 and not k.startswith('elemental_forms_')}
-            _data = {}
-            unitless_keys = ('van_der_waals_atomic_radius',
-                         'empirical_atomic_radius', 'covalent_atomic_radius',
-                         'melting_point', 'boiling_point', 'electron_affinity',
-                         'first_ionisation_energy')
-            for key in unitless_keys:
-                if key not in d:
-                    continue  # skip as no such key
-                value, unit = split_unit(d.pop(key))
-                if value is None or unit is None:
-                    continue  # skip as data invalid
-                unit = re.sub('[_]?[0-9]+', '', str(unit)) or ''
-                if not unit:
-                    continue  # unit data is corrupted
-                unit = 'pm' if (unit.isnumeric() or not unit) else unit
-                unit = {'k': 'kelvin'}.get(unit.lower(), unit.lower())
-                key = f"{key}_{unit}".rstrip('_')
-                if key not in unitless_keys and re.match('.*_$', key):
-                    _data[key] = value
-
-            for key in ('period', 'group'):
-                _data[key] = int(re.sub('[\ \-A-Za-z]+', '',
-                                 str(d.pop(key))) or "0") or -1
-
-            _data['atomic_mass'] = np.mean(float(remove_brackets(d.pop('atomic_weight'))))
-            _data['density_g_per_cm3'] = split_unit(d.pop('density', ''))[0]
-            _data['uses'] = "\n".join(element.get('uses', '')) or None
-            _data['description'] = element.get('description', element.get('about', '')) or None
-
-            _data.update(**d)
-
-            elem = Element(atomic_number=int(num), **_data)
+            elem, isotopes, oxidation_states = self._parse_element(num, element)
             elem.save()
-
-            for isotope, _data in element.get('isotopes', {}).items():
-                progress.set_description(f"Processing Isotope: {isotope}...")
-                _data['year_discovered'] = _data.pop('discovered', None) or None
-                try:
-                    atomic_mass = _data.pop('atomic_mass', "")
-                    mass, unc = re.sub('[\(\[].*[\)\]]', '', str(atomic_mass).replace(' ', '')).split("±")
-                    _data['atomic_mass'] = float(mass)
-                    _data['atomic_mass_uncertainty'] = float(unc)
-                except Exception as err:
-                    print(f"Could not extract atomic mass from {atomic_mass!r} due to {err!r}",
-                          file=sys.stderr)
-                iso = Isotope(isotope, **_data)
+            for iso in isotopes:
+                progress.set_description(f"Processing Isotope: {iso.isotope}...")
                 iso.save()
-                # print(f"Saved isotope: {isotope}")
-
-            # print(f"Saved element: {element['symbol']}")
+            elem.oxidation_states.all().delete()
+            OxidationState.objects.bulk_create(oxidation_states)
+            count += 1 + len(isotopes) + len(oxidation_states)
+        return count
+
+    def _bulk_create_elements(self, elements, batch_size):
+        """Parse all data up front, then upsert it in one transaction."""
+        parsed_elements, parsed_isotopes, parsed_states = [], [], []
+        for num, element in tqdm(tuple(elements.items()), desc="Parsing",
+                                 disable=not self.verbosity):
+            elem, isotopes, oxidation_states = self._parse_element(num, element)
+            parsed_elements.append(elem)
+            parsed_isotopes.extend(isotopes)
+            parsed_states.extend(oxidation_states)
+
+        for iso in parsed_isotopes:
+            update_computedfields(iso)  # bulk_create() bypasses save()
+
+        with transaction.atomic():
+            for model, objs in ((Element, parsed_elements),
+                                (Isotope, parsed_isotopes)):
+                pk = model._meta.pk
+                model.objects.bulk_create(
+                    objs, batch_size=batch_size, update_conflicts=True,
+                    unique_fields=[pk.name],
+                    update_fields=[f.name for f in model._meta.concrete_fields
+                                   if f is not pk])
+            # states have no natural key to upsert on, so replace them
+            OxidationState.objects.filter(element__in=parsed_elements).delete()
+            OxidationState.objects.bulk_create(parsed_states, batch_size=batch_size)
+        return len(parsed_elements) + len(parsed_isotopes) + len(parsed_states)
 
     def handle(self, *args, **options):
         """Perform actions to manipulate database."""
-        self._create_elements()
+        self.verbosity = options['verbosity']
+        with open(options['input']) as f:
+            elements = json.load(f)
+
+        start = time.perf_counter()
+        if options['bulk']:
+            count = self._bulk_create_elements(elements, options['batch_size'])
+        else:
+            count = self._create_elements(elements)
+        search.rebuild_index()
+        elapsed = time.perf_counter() - start
+        dataset.bump_version()
+
+        self.stdout.write(f"Wrote {count} rows in {elapsed:.2f}s "
+                          f"({count / max(elapsed, 1e-9):.0f} rows/s)")
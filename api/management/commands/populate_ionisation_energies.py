@@ -0,0 +1,57 @@
+"""Load successive ionisation energies of the elements in bulk."""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import dataset
+from api.models import ATOMIC_NUMBERS, Element, IonisationEnergies
+from parsers.values import parse_number
+
+
+class Command(BaseCommand):
+    help = ('Populates the database with successive ionisation energies '
+            '(kJ/mol) from a JSON mapping of element to energy series')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', default='ionisation_energies.json',
+                            help='JSON file mapping element symbols or atomic '
+                                 'numbers to lists of energies, first to last')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='rows per INSERT')
+
+    def parse(self, data):
+        """Yield unsaved IonisationEnergies rows for elements in the database."""
+        known = set(Element.objects.values_list('atomic_number', flat=True))
+        for key, series in data.items():
+            key = str(key)
+            number = int(key) if key.isascii() and key.isdecimal() \
+                else ATOMIC_NUMBERS.get(key)
+            if number not in known:
+                self.stderr.write(f"Skipping unknown element {key!r}")
+                continue
+            for ionisation_number, energy in enumerate(series, start=1):
+                energy = parse_number(energy)
+                if energy is not None:
+                    yield IonisationEnergies(element_id=number, energy=energy,
+                                             ionisation_number=ionisation_number)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['input']) as f:
+                data = json.load(f)
+        except OSError as err:
+            raise CommandError(err)
+
+        start = time.perf_counter()
+        rows = list(self.parse(data))
+        with transaction.atomic():
+            IonisationEnergies.objects.bulk_create(
+                rows, batch_size=options['batch_size'], update_conflicts=True,
+                unique_fields=['element', 'ionisation_number'],
+                update_fields=['energy'])
+        elapsed = time.perf_counter() - start
+        dataset.bump_version()
+
+        self.stdout.write(f"Wrote {len(rows)} ionisation energies in {elapsed:.2f}s")
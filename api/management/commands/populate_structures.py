@@ -0,0 +1,47 @@
+"""Load the crystal structures bundled with the crystals package."""
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import crystals
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tqdm import tqdm
+
+from api import dataset
+from api.models import CrystalStructure
+from parsers.crystals_serialiser import structure_record
+
+
+class Command(BaseCommand):
+    help = ('Populates the database with crystal structures, serialised in a '
+            'process pool and upserted in batches')
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            help='builtin crystals to load (default: all)')
+        parser.add_argument('--processes', type=int, default=None,
+                            help='worker processes (default: one per CPU)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='rows per INSERT')
+
+    def handle(self, *args, **options):
+        names = options['names'] or sorted(crystals.Crystal.builtins)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(options['processes']) as pool:
+            records = list(tqdm(pool.map(structure_record, names, chunksize=4),
+                                total=len(names), desc='Serialising crystals',
+                                disable=options['verbosity'] == 0))
+
+        structures = [CrystalStructure(**record) for record in records]
+        update_fields = [f.name for f in CrystalStructure._meta.concrete_fields
+                         if not f.primary_key and f.name != 'name']
+        with transaction.atomic():
+            CrystalStructure.objects.bulk_create(
+                structures, batch_size=options['batch_size'],
+                update_conflicts=True, unique_fields=['name'],
+                update_fields=update_fields)
+        elapsed = time.perf_counter() - start
+        dataset.bump_version()
+
+        self.stdout.write(f"Wrote {len(structures)} structures in {elapsed:.2f}s")
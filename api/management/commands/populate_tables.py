@@ -0,0 +1,88 @@
+"""Load the periods, groups and blocks of the periodic table."""
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import dataset
+from api.models import Block, Element, Group, Period
+
+BLOCK_DESCRIPTIONS = {
+    's': 'Elements whose highest-energy electrons occupy an s orbital: '
+         'groups 1 and 2, plus hydrogen and helium.',
+    'p': 'Elements whose highest-energy electrons occupy a p orbital: '
+         'groups 13 to 18, except helium.',
+    'd': 'Elements whose highest-energy electrons occupy a d orbital: '
+         'the transition metals of groups 3 to 12.',
+    'f': 'Elements whose highest-energy electrons occupy an f orbital: '
+         'the lanthanides and actinides.',
+}
+
+# groups spanned by each block; helium (group 18) and the f-block elements
+# sit outside them
+BLOCK_GROUPS = {
+    's': [1, 2],
+    'p': list(range(13, 19)),
+    'd': list(range(3, 13)),
+    'f': [],
+}
+
+
+class Command(BaseCommand):
+    help = ('Populates the database with periods from a JSON file, and with '
+            'the groups and blocks occupied by the loaded elements')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periods', default='periods.json',
+                            help='JSON list of periods to load')
+
+    def parse_periods(self, data):
+        """Yield unsaved Periods from `periods.json` entries."""
+        for entry in data:
+            source_date = entry.get('source_date')
+            yield Period(
+                number=int(entry['number']), name=entry['name'],
+                description=entry.get('description', ''),
+                trends=entry.get('trends', ''), source=entry.get('source'),
+                source_date=source_date and datetime.date.fromisoformat(source_date))
+
+    def derive_tables(self):
+        """Return unsaved Groups and Blocks for the elements in the database."""
+        groups, blocks = set(), set()
+        for group, block in Element.objects.values_list('group', 'block'):
+            if group > 0:
+                groups.add(group)
+            if block is not None:
+                blocks.add(block)
+        return (
+            [Group(number=number, name=f"Group {number}") for number in sorted(groups)],
+            [Block(name=name, description=BLOCK_DESCRIPTIONS.get(name, ''),
+                   groups=BLOCK_GROUPS.get(name, [])) for name in sorted(blocks)],
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['periods']) as f:
+                periods = list(self.parse_periods(json.load(f)))
+        except OSError as err:
+            raise CommandError(err)
+
+        start = time.perf_counter()
+        groups, blocks = self.derive_tables()
+        with transaction.atomic():
+            Period.objects.bulk_create(
+                periods, update_conflicts=True, unique_fields=['number'],
+                update_fields=['name', 'description', 'trends', 'source',
+                               'source_date'])
+            # keep descriptions that were edited through the API
+            Group.objects.bulk_create(groups, update_conflicts=True,
+                                      unique_fields=['number'], update_fields=['name'])
+            Block.objects.bulk_create(blocks, update_conflicts=True,
+                                      unique_fields=['name'], update_fields=['groups'])
+        elapsed = time.perf_counter() - start
+        dataset.bump_version()
+
+        self.stdout.write(f"Wrote {len(periods)} periods, {len(groups)} groups "
+                          f"and {len(blocks)} blocks in {elapsed:.2f}s")
@@ -0,0 +1,192 @@
+"""
+Per-request phase timings and per-route latency histograms.
+
+`ServerTimingMiddleware` (see ``api/middleware.py``) opens a `RequestTimings`
+for every request. Code on the request path adds to it with `timed()` or
+`current()`, which cost a context variable lookup when no request is being
+timed. SQL statements are counted and timed by a wrapper installed on every
+database connection. Finished requests are aggregated into `registry`, which
+renders the Prometheus text format.
+"""
+import bisect
+import contextlib
+import contextvars
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# reported in this order; `db`, `filter` and `serialize` are part of `view`
+PHASES = ('db', 'filter', 'serialize', 'view', 'render', 'total')
+
+PARAM_RE = re.compile(r'^[a-z0-9_]+$')
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Seconds spent per phase and SQL statements run by one request."""
+    __slots__ = ('phases', 'queries', 'view_start', 'view_end')
+
+    def __init__(self):
+        self.phases = {}
+        self.queries = 0
+        self.view_start = self.view_end = None
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self):
+        """Value of the `Server-Timing` header, durations in milliseconds."""
+        entries = []
+        for phase in PHASES:
+            if phase in self.phases:
+                entry = f"{phase};dur={1000 * self.phases[phase]:.3f}"
+                if phase == 'db':
+                    entry += f';desc="{self.queries} queries"'
+                entries.append(entry)
+        return ", ".join(entries)
+
+
+def current():
+    """The timings of the request being handled, or None."""
+    return _current.get()
+
+
+def start():
+    """Begin timing a request; pass the token to `stop()`."""
+    return _current.set(RequestTimings())
+
+
+def stop(token):
+    _current.reset(token)
+
+
+@contextlib.contextmanager
+def timed(phase):
+    """Add the time spent in the block to `phase` of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    begin = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - begin)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each statement to the `db` phase."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    begin = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - begin)
+        timings.queries += 1
+
+
+def install(connection, **kwargs):
+    """Install `record_query` on `connection` (a `connection_created` receiver)."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install)
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect.bisect_left(BUCKETS, value)
+        if i < len(BUCKETS):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Phase latency histograms and SQL query counters labelled by route,
+    method and the sorted names (not values) of the query parameters, so
+    slow `?fields=`/filter combinations stand out. Label sets beyond
+    `settings.API_METRICS_MAX_SERIES` are folded into ``params="other"``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.histograms = {}
+        self.queries = {}
+
+    def labels(self, request):
+        match = request.resolver_match
+        route = (match.view_name or match.route) if match is not None else 'unmatched'
+        names = sorted(name for name in request.GET if PARAM_RE.match(name))
+        labels = (route, request.method, ",".join(names)[:200])
+        if labels not in self.queries and len(self.queries) >= settings.API_METRICS_MAX_SERIES:
+            labels = (route, request.method, 'other')
+        return labels
+
+    def observe(self, request, timings):
+        labels = self.labels(request)
+        with self._lock:
+            for phase, seconds in timings.phases.items():
+                histogram = self.histograms.get((labels, phase))
+                if histogram is None:
+                    histogram = self.histograms[(labels, phase)] = Histogram()
+                histogram.observe(seconds)
+            self.queries[labels] = self.queries.get(labels, 0) + timings.queries
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        def escape(value):
+            return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+        def format_labels(labels, **extra):
+            route, method, params = labels
+            pairs = [('route', route), ('method', method), ('params', params),
+                     *extra.items()]
+            return "{" + ",".join(f'{k}="{escape(str(v))}"' for k, v in pairs) + "}"
+
+        lines = ['# HELP api_request_phase_seconds Time spent per request in each phase.',
+                 '# TYPE api_request_phase_seconds histogram']
+        with self._lock:
+            for (labels, phase), histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f"api_request_phase_seconds_bucket"
+                                 f"{format_labels(labels, phase=phase, le=bound)} {cumulative}")
+                lines.append(f"api_request_phase_seconds_bucket"
+                             f"{format_labels(labels, phase=phase, le='+Inf')} {histogram.count}")
+                lines.append(f"api_request_phase_seconds_sum"
+                             f"{format_labels(labels, phase=phase)} {histogram.sum!r}")
+                lines.append(f"api_request_phase_seconds_count"
+                             f"{format_labels(labels, phase=phase)} {histogram.count}")
+            lines += ['# HELP api_db_queries_total SQL statements run by requests.',
+                      '# TYPE api_db_queries_total counter']
+            for labels, count in sorted(self.queries.items()):
+                lines.append(f"api_db_queries_total{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
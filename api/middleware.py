@@ -0,0 +1,66 @@
+"""Request instrumentation middleware."""
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+
+from api import metrics
+
+
+class ServerTimingMiddleware:
+    """
+    Time each request by phase - SQL, filtering, serialization, the view as
+    a whole and rendering - report the durations in a `Server-Timing`
+    header and record them in the per-route histograms served at /metrics.
+    Put it first in MIDDLEWARE so `total` covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            metrics.install(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        begin = time.perf_counter()
+        token = metrics.start()
+        try:
+            response = self.get_response(request)
+            return self.finish(request, response, begin)
+        finally:
+            metrics.stop(token)
+
+    async def __acall__(self, request):
+        begin = time.perf_counter()
+        token = metrics.start()
+        try:
+            response = await self.get_response(request)
+            return self.finish(request, response, begin)
+        finally:
+            metrics.stop(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics.current().view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # called once the view has returned, before the response is rendered
+        metrics.current().view_end = time.perf_counter()
+        return response
+
+    def finish(self, request, response, begin):
+        end = time.perf_counter()
+        timings = metrics.current()
+        if timings.view_start is not None:
+            timings.add('view', (timings.view_end or end) - timings.view_start)
+            if timings.view_end is not None:
+                timings.add('render', end - timings.view_end)
+        timings.add('total', end - begin)
+        response['Server-Timing'] = timings.server_timing()
+        metrics.registry.observe(request, timings)
+        return response
@@ -0,0 +1,125 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:15
+
+import jsonfield.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Block',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=1)),
+                ('description', models.CharField(max_length=10000)),
+                ('groups', jsonfield.fields.JSONField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CrystalStructure',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symmetry', models.CharField(max_length=20)),
+                ('a', models.FloatField()),
+                ('b', models.FloatField()),
+                ('c', models.FloatField()),
+                ('α', models.FloatField()),
+                ('β', models.FloatField()),
+                ('γ', models.FloatField()),
+                ('name', models.CharField(max_length=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Element',
+            fields=[
+                ('atomic_number', models.IntegerField(primary_key=True, serialize=False, unique=True)),
+                ('name', models.CharField(max_length=40, unique=True)),
+                ('symbol', models.CharField(max_length=2, unique=True)),
+                ('group', models.IntegerField()),
+                ('period', models.IntegerField()),
+                ('melting_point_kelvin', models.FloatField(null=True)),
+                ('boiling_point_kelvin', models.FloatField(null=True)),
+                ('atomic_mass', models.FloatField(null=True)),
+                ('empirical_atomic_radius_pm', models.FloatField(null=True)),
+                ('covalent_atomic_radius_pm', models.FloatField(null=True)),
+                ('van_der_waals_atomic_radius_pm', models.FloatField(null=True)),
+                ('density_g_per_cm3', models.FloatField(null=True)),
+                ('pauling_scale_electronegativity', models.FloatField(null=True)),
+                ('allen_scale_electronegativity', models.FloatField(null=True)),
+                ('electron_affinity_ev', models.FloatField(null=True)),
+                ('electron_configuration', models.CharField(max_length=50, null=True)),
+                ('ground_level', models.CharField(max_length=50, null=True)),
+                ('first_ionisation_energy_ev', models.FloatField(null=True)),
+                ('element_classification', models.CharField(max_length=30, null=True)),
+                ('appearance', models.CharField(max_length=100, null=True)),
+                ('year_discovered', models.IntegerField(null=True)),
+                ('discovered_by', models.CharField(max_length=100, null=True)),
+                ('estimated_crustal_abundance', models.CharField(max_length=20, null=True)),
+                ('estimated_oceanic_abundance', models.CharField(max_length=20, null=True)),
+                ('estimated_universal_abundance', models.CharField(max_length=20, null=True)),
+                ('description', models.CharField(max_length=5000, null=True)),
+                ('sources', models.CharField(max_length=3000, null=True)),
+                ('uses', models.CharField(max_length=3000, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Group',
+            fields=[
+                ('number', models.IntegerField(default=1, primary_key=True, serialize=False, unique=True)),
+                ('name', models.CharField(max_length=15, null=True, unique=True)),
+                ('description', models.CharField(max_length=10000)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IonisationEnergies',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('atomic_number', models.IntegerField()),
+                ('ionisation_number', models.IntegerField()),
+                ('energy', models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Isotope',
+            fields=[
+                ('isotope', models.CharField(default='1H', max_length=10, primary_key=True, serialize=False)),
+                ('abundance', models.FloatField(null=True)),
+                ('atomic_mass', models.FloatField(null=True)),
+                ('atomic_mass_uncertainty', models.FloatField(null=True)),
+                ('decay_modes', models.CharField(max_length=80, null=True)),
+                ('year_discovered', models.IntegerField(null=True)),
+                ('halflife', models.CharField(max_length=30, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Orbital',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20)),
+                ('ms_quantum_number', models.IntegerField(default=0.5)),
+                ('l_quantum_number', models.IntegerField(default=0)),
+                ('n_quantum_number', models.IntegerField(default=1)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OxidationState',
+            fields=[
+                ('symbol', models.CharField(default='H', max_length=2)),
+                ('state', models.IntegerField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Period',
+            fields=[
+                ('number', models.IntegerField(default=1, primary_key=True, serialize=False, unique=True)),
+                ('name', models.CharField(max_length=15, null=True, unique=True)),
+                ('description', models.CharField(max_length=10000)),
+            ],
+        ),
+    ]
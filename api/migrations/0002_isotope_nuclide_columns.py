@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:17
+
+import re
+
+from django.db import migrations, models
+
+# frozen copies of the api.models helpers as of this migration
+SYMBOLS = """
+    H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni
+    Cu Zn Ga Ge As Se Br Kr Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe
+    Cs Ba La Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb Lu Hf Ta W Re Os Ir Pt Au Hg
+    Tl Pb Bi Po At Rn Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf Es Fm Md No Lr Rf Db Sg
+    Bh Hs Mt Ds Rg Cn Nh Fl Mc Lv Ts Og
+""".split()
+ATOMIC_NUMBERS = {symbol: z for z, symbol in enumerate(SYMBOLS, start=1)}
+
+NUCLIDE_RE = re.compile(r'^\s*(\d+)\s*([A-Z][a-z]?)')
+
+
+def parse_nuclide(nuclide):
+    match = NUCLIDE_RE.match(str(nuclide))
+    if match is None:
+        return None, "".join([ch for ch in str(nuclide) if ch.isalpha()])
+    return int(match.group(1)), match.group(2)
+
+
+def populate_nuclide_columns(apps, schema_editor):
+    Isotope = apps.get_model('api', 'Isotope')
+    isotopes = list(Isotope.objects.all())
+    for isotope in isotopes:
+        isotope.mass_number, isotope.element = parse_nuclide(isotope.isotope)
+        if isotope.mass_number is not None and isotope.element in ATOMIC_NUMBERS:
+            isotope.neutrons = isotope.mass_number - ATOMIC_NUMBERS[isotope.element]
+    Isotope.objects.bulk_update(isotopes, ['element', 'mass_number', 'neutrons'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='isotope',
+            name='element',
+            field=models.CharField(default='', editable=False, max_length=2),
+        ),
+        migrations.AddField(
+            model_name='isotope',
+            name='mass_number',
+            field=models.IntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='isotope',
+            name='neutrons',
+            field=models.IntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='isotope',
+            index=models.Index(fields=['element', 'neutrons'], name='api_isotope_element_b33d7b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='isotope',
+            index=models.Index(fields=['element', 'mass_number'], name='api_isotope_element_3dc80b_idx'),
+        ),
+        migrations.RunPython(populate_nuclide_columns, migrations.RunPython.noop),
+    ]
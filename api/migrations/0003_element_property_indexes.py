@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_isotope_nuclide_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['atomic_mass'], name='api_element_atomic__dc2627_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['melting_point_kelvin'], name='api_element_melting_d83d66_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['boiling_point_kelvin'], name='api_element_boiling_763cbf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['density_g_per_cm3'], name='api_element_density_868d91_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['empirical_atomic_radius_pm'], name='api_element_empiric_4064f3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['covalent_atomic_radius_pm'], name='api_element_covalen_597a18_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['van_der_waals_atomic_radius_pm'], name='api_element_van_der_a11d1d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['pauling_scale_electronegativity'], name='api_element_pauling_8e467f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['allen_scale_electronegativity'], name='api_element_allen_s_03d597_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['electron_affinity_ev'], name='api_element_electro_dd3d79_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['first_ionisation_energy_ev'], name='api_element_first_i_a68b50_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['year_discovered'], name='api_element_year_di_73116c_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_element_property_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crystalstructure',
+            name='atoms',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='crystalstructure',
+            name='chemical_formula',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='crystalstructure',
+            name='lattice_system',
+            field=models.CharField(default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='crystalstructure',
+            name='lattice_vectors',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='crystalstructure',
+            name='reciprocal_vectors',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='crystalstructure',
+            name='space_group_number',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='crystalstructure',
+            name='volume',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='crystalstructure',
+            name='name',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='crystalstructure',
+            name='symmetry',
+            field=models.CharField(max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_crystal_structure_columns'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='ionisationenergies',
+            old_name='atomic_number',
+            new_name='element',
+        ),
+        migrations.AlterField(
+            model_name='ionisationenergies',
+            name='element',
+            field=models.ForeignKey(db_column='atomic_number', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ionisation_energies', to='api.element'),
+        ),
+        migrations.AddConstraint(
+            model_name='ionisationenergies',
+            constraint=models.UniqueConstraint(fields=('element', 'ionisation_number'), name='unique_ionisation_energy'),
+        ),
+    ]
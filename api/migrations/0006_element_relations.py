@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# frozen copy of api.models.ATOMIC_NUMBERS as of this migration
+SYMBOLS = """
+    H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni
+    Cu Zn Ga Ge As Se Br Kr Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe
+    Cs Ba La Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb Lu Hf Ta W Re Os Ir Pt Au Hg
+    Tl Pb Bi Po At Rn Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf Es Fm Md No Lr Rf Db Sg
+    Bh Hs Mt Ds Rg Cn Nh Fl Mc Lv Ts Og
+""".split()
+ATOMIC_NUMBERS = {symbol: z for z, symbol in enumerate(SYMBOLS, start=1)}
+
+
+def populate_atomic_numbers(apps, schema_editor):
+    Isotope = apps.get_model('api', 'Isotope')
+    isotopes = list(Isotope.objects.all())
+    for isotope in isotopes:
+        isotope.atomic_number_id = ATOMIC_NUMBERS.get(isotope.element)
+    Isotope.objects.bulk_update(isotopes, ['atomic_number'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_ionisation_energy_series'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='isotope',
+            name='atomic_number',
+            field=models.ForeignKey(db_column='atomic_number', db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='isotopes', to='api.element'),
+        ),
+        migrations.RunPython(populate_atomic_numbers, migrations.RunPython.noop),
+        # one row per state across the whole table could not hold real data
+        migrations.DeleteModel(
+            name='OxidationState',
+        ),
+        migrations.CreateModel(
+            name='OxidationState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('state', models.IntegerField()),
+                ('element', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='oxidation_states', to='api.element')),
+            ],
+            options={
+                'ordering': ['element', 'state'],
+                'constraints': [models.UniqueConstraint(fields=('element', 'state'), name='unique_oxidation_state')],
+            },
+        ),
+    ]
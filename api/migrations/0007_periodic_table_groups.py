@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+# frozen copies of the api.models helpers as of this migration
+F_BLOCK = (*range(57, 71), *range(89, 103))
+
+
+def block_of(atomic_number, group):
+    if atomic_number == 2 or 1 <= group <= 2:
+        return 's'
+    if atomic_number in F_BLOCK:
+        return 'f'
+    if 3 <= group <= 12:
+        return 'd'
+    if 13 <= group <= 18:
+        return 'p'
+    return None
+
+
+def populate_blocks(apps, schema_editor):
+    Element = apps.get_model('api', 'Element')
+    elements = list(Element.objects.all())
+    for element in elements:
+        element.block = block_of(element.atomic_number, element.group)
+    Element.objects.bulk_update(elements, ['block'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_element_relations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='element',
+            name='block',
+            field=models.CharField(db_index=True, max_length=1, null=True),
+        ),
+        migrations.RunPython(populate_blocks, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='period',
+            name='source',
+            field=models.CharField(max_length=200, null=True),
+        ),
+        migrations.AddField(
+            model_name='period',
+            name='source_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='period',
+            name='trends',
+            field=models.CharField(default='', max_length=10000),
+        ),
+        migrations.AlterField(
+            model_name='block',
+            name='groups',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='block',
+            name='name',
+            field=models.CharField(max_length=1, unique=True),
+        ),
+    ]
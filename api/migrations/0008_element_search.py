@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:05
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    # external content: the index reads the text from api_element
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE api_element_search USING fts5("
+        "name, symbol, discovered_by, appearance, description, uses, sources, "
+        "content='api_element', content_rowid='atomic_number', "
+        "tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')")
+    schema_editor.execute(
+        "INSERT INTO api_element_search(api_element_search) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS api_element_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_periodic_table_groups'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,6 +1,57 @@
+import re
+
 from django.db import models
 from computedfields.models import computed, ComputedFieldsModel
-from jsonfield import JSONField
+
+
+SYMBOLS = (
+    'H', 'He', 'Li', 'Be', 'B', 'C', 'N', 'O', 'F', 'Ne', 'Na', 'Mg', 'Al',
+    'Si', 'P', 'S', 'Cl', 'Ar', 'K', 'Ca', 'Sc', 'Ti', 'V', 'Cr', 'Mn', 'Fe',
+    'Co', 'Ni', 'Cu', 'Zn', 'Ga', 'Ge', 'As', 'Se', 'Br', 'Kr', 'Rb', 'Sr',
+    'Y', 'Zr', 'Nb', 'Mo', 'Tc', 'Ru', 'Rh', 'Pd', 'Ag', 'Cd', 'In', 'Sn',
+    'Sb', 'Te', 'I', 'Xe', 'Cs', 'Ba', 'La', 'Ce', 'Pr', 'Nd', 'Pm', 'Sm',
+    'Eu', 'Gd', 'Tb', 'Dy', 'Ho', 'Er', 'Tm', 'Yb', 'Lu', 'Hf', 'Ta', 'W',
+    'Re', 'Os', 'Ir', 'Pt', 'Au', 'Hg', 'Tl', 'Pb', 'Bi', 'Po', 'At', 'Rn',
+    'Fr', 'Ra', 'Ac', 'Th', 'Pa', 'U', 'Np', 'Pu', 'Am', 'Cm', 'Bk', 'Cf',
+    'Es', 'Fm', 'Md', 'No', 'Lr', 'Rf', 'Db', 'Sg', 'Bh', 'Hs', 'Mt', 'Ds',
+    'Rg', 'Cn', 'Nh', 'Fl', 'Mc', 'Lv', 'Ts', 'Og'
+)
+ATOMIC_NUMBERS = {symbol: z for z, symbol in enumerate(SYMBOLS, start=1)}
+
+# numeric element properties that are indexed and filterable by range
+INDEXED_PROPERTIES = (
+    'atomic_mass', 'melting_point_kelvin', 'boiling_point_kelvin',
+    'density_g_per_cm3', 'empirical_atomic_radius_pm',
+    'covalent_atomic_radius_pm', 'van_der_waals_atomic_radius_pm',
+    'pauling_scale_electronegativity', 'allen_scale_electronegativity',
+    'electron_affinity_ev', 'first_ionisation_energy_ev', 'year_discovered',
+)
+
+# lanthanides and actinides, excluding lutetium and lawrencium (d-block)
+F_BLOCK = (*range(57, 71), *range(89, 103))
+
+NUCLIDE_RE = re.compile(r'^\s*(\d+)\s*([A-Z][a-z]?)')
+
+
+def parse_nuclide(nuclide):
+    """Split a nuclide label such as '56Fe' into (mass number, symbol)."""
+    match = NUCLIDE_RE.match(str(nuclide))
+    if match is None:
+        return None, "".join([ch for ch in str(nuclide) if ch.isalpha()])
+    return int(match.group(1)), match.group(2)
+
+
+def block_of(atomic_number, group):
+    """Name of the periodic table block ('s', 'p', 'd' or 'f') of an element."""
+    if atomic_number == 2 or 1 <= group <= 2:
+        return 's'
+    if atomic_number in F_BLOCK:
+        return 'f'
+    if 3 <= group <= 12:
+        return 'd'
+    if 13 <= group <= 18:
+        return 'p'
+    return None
 
 
 class Group(models.Model):
@@ -13,6 +64,9 @@ class Period(models.Model):
     number = models.IntegerField(unique=True, primary_key=True, default=1)
     name = models.CharField(unique=True, max_length=15, null=True)
     description = models.CharField(max_length=10000)
+    trends = models.CharField(max_length=10000, default='')
+    source = models.CharField(max_length=200, null=True)
+    source_date = models.DateField(null=True)
 
 
 class Orbital(models.Model):
@@ -24,30 +78,49 @@ class Orbital(models.Model):
 
 
 class Block(models.Model):
-    name = models.CharField(max_length=1)
+    name = models.CharField(max_length=1, unique=True)
     description = models.CharField(max_length=10000)
-    groups = JSONField()
+    groups = models.JSONField(default=list)
 
 
 class CrystalStructure(models.Model):
-    symmetry = models.CharField(max_length=20)
+    symmetry = models.CharField(max_length=20, null=True)
     a = models.FloatField()
     b = models.FloatField()
     c = models.FloatField()
     α = models.FloatField()
     β = models.FloatField()
     γ = models.FloatField()
-    name = models.CharField(max_length=20)
+    name = models.CharField(max_length=20, unique=True)
+    chemical_formula = models.CharField(max_length=100, default='')
+    lattice_system = models.CharField(max_length=20, default='')
+    space_group_number = models.IntegerField(null=True)
+
+    # precomputed from the lattice parameters, in Å and Å⁻¹
+    volume = models.FloatField(null=True)
+    lattice_vectors = models.JSONField(default=list)
+    reciprocal_vectors = models.JSONField(default=list)
+    # [element, x, y, z, occupancy] with fractional coordinates
+    atoms = models.JSONField(default=list)
 
 
 class IonisationEnergies(models.Model):
     ENERGY_UNIT = "kJ⋅mol⁻¹"  # constant
     DATA_SOURCE = "https://en.wikipedia.org/wiki/Ionization_energies_of_the_elements_(data_page)"
 
-    atomic_number = models.IntegerField()
+    element = models.ForeignKey('Element', on_delete=models.CASCADE,
+                                db_column='atomic_number', db_index=False,
+                                related_name='ionisation_energies')
     ionisation_number = models.IntegerField()
     energy = models.FloatField()
 
+    class Meta:
+        # also serves as the (atomic_number, ionisation_number) index
+        constraints = [
+            models.UniqueConstraint(fields=['element', 'ionisation_number'],
+                                    name='unique_ionisation_energy'),
+        ]
+
 
 class Element(models.Model):
     atomic_number = models.IntegerField(unique=True, primary_key=True)
@@ -55,6 +128,7 @@ class Element(models.Model):
     symbol = models.CharField(unique=True, max_length=2, null=False)
     group = models.IntegerField(null=False)
     period = models.IntegerField(null=False)
+    block = models.CharField(max_length=1, null=True, db_index=True)
 
     # physical properties
     melting_point_kelvin = models.FloatField(null=True)
@@ -86,13 +160,24 @@ class Element(models.Model):
     sources = models.CharField(max_length=3000, null=True)
     uses = models.CharField(max_length=3000, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=[name]) for name in INDEXED_PROPERTIES]
+
 
 class OxidationState(models.Model):
-    symbol = models.CharField(max_length=2, null=False, default="H")
-    state = models.IntegerField(primary_key=True, null=False)
+    element = models.ForeignKey(Element, on_delete=models.CASCADE,
+                                db_index=False, related_name='oxidation_states')
+    state = models.IntegerField(null=False)
 
+    class Meta:
+        ordering = ['element', 'state']
+        constraints = [
+            models.UniqueConstraint(fields=['element', 'state'],
+                                    name='unique_oxidation_state'),
+        ]
 
-class Isotope(models.Model):
+
+class Isotope(ComputedFieldsModel):
     isotope = models.CharField(primary_key=True, max_length=10, default="1H")
     abundance = models.FloatField(null=True)
     atomic_mass = models.FloatField(null=True)
@@ -101,16 +186,38 @@ class Isotope(models.Model):
     year_discovered = models.IntegerField(null=True)
     halflife = models.CharField(max_length=30, null=True)
 
-    # @computed(models.CharField(max_length=2, null=False),
-    #           depends=[['self', ['isotope']]])
-    # def element(self):
-    #     return "".join([ch for ch in self.isotope if ch.isalpha()])
+    class Meta:
+        indexes = [
+            models.Index(fields=['element', 'neutrons']),
+            models.Index(fields=['element', 'mass_number']),
+        ]
 
-    @property
+    @computed(models.CharField(max_length=2, null=False, default=''),
+              depends=[('self', ['isotope'])])
     def element(self):
-        return "".join([ch for ch in self.isotope if ch.isalpha()])
-
-    @property
+        """Get element symbol for isotope."""
+        return parse_nuclide(self.isotope)[1]
+
+    @computed(models.ForeignKey(Element, null=True, on_delete=models.DO_NOTHING,
+                                db_constraint=False, db_column='atomic_number',
+                                related_name='isotopes'),
+              depends=[('self', ['isotope'])])
+    def atomic_number(self):
+        """Get the element of the isotope without querying for it."""
+        number = ATOMIC_NUMBERS.get(parse_nuclide(self.isotope)[1])
+        return None if number is None else Element(atomic_number=number)
+
+    @computed(models.IntegerField(null=True, db_index=True),
+              depends=[('self', ['isotope'])])
+    def mass_number(self):
+        """Get number of nucleons for isotope."""
+        return parse_nuclide(self.isotope)[0]
+
+    @computed(models.IntegerField(null=True, db_index=True),
+              depends=[('self', ['isotope'])])
     def neutrons(self):
         """Get number of neutrons for isotope."""
-        return int("".join([ch for ch in self.isotope if ch.isnumeric()]))
+        mass_number, symbol = parse_nuclide(self.isotope)
+        if mass_number is None or symbol not in ATOMIC_NUMBERS:
+            return None
+        return mass_number - ATOMIC_NUMBERS[symbol]
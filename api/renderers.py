@@ -0,0 +1,78 @@
+import io
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def column_array(values):
+    """
+    Convert a list of values (None for null) into a ``(array, mask)`` pair,
+    where `mask` is True for null entries.
+    """
+    mask = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+    present = [v for v in values if v is not None]
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        array = np.array([0 if v is None else v for v in values], dtype=np.int64)
+    elif all(isinstance(v, (int, float)) for v in present):
+        array = np.array([np.nan if v is None else v for v in values],
+                         dtype=np.float64)
+    else:
+        array = np.array(['' if v is None else str(v) for v in values])
+    return array, mask
+
+
+class NpzRenderer(BaseRenderer):
+    """
+    Render a mapping of column name to values as a NumPy ``.npz`` archive.
+
+    Each column is stored as ``<name>`` with a boolean ``<name>__mask``
+    array marking the null entries.
+    """
+    media_type = 'application/x-npz'
+    format = 'npz'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        arrays = {}
+        for name, values in data.items():
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            arrays[name], arrays[f'{name}__mask'] = column_array(list(values))
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Render records as newline-delimited JSON, one object per line.
+
+    `stream` yields the encoded lines in chunks so that views can send large
+    results with a `StreamingHttpResponse` as they are produced.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+    chunk_size = 500
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = [data]
+        return b''.join(self.stream(data))
+
+    def stream(self, records):
+        encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        lines = []
+        for record in records:
+            lines.append(encoder.encode(record))
+            if len(lines) >= self.chunk_size:
+                yield ('\n'.join(lines) + '\n').encode()
+                lines = []
+        if lines:
+            yield ('\n'.join(lines) + '\n').encode()
@@ -0,0 +1,71 @@
+"""
+Full-text search over the free-text columns of elements.
+
+An FTS5 table (created by migration 0008) indexes the `COLUMNS` of
+``api_element``. It is an external-content table: the text itself stays in
+``api_element`` and only the index is stored, so it must be rebuilt whenever
+elements change - `populate_db` and writes to /api/elements/ do so. Matches are
+ranked with bm25, weighting names above the descriptive text.
+"""
+import re
+
+from django.db import connection
+
+TABLE = 'api_element_search'
+
+# indexed columns of api_element, in table order, with their bm25 weights
+COLUMNS = (('name', 10.0), ('symbol', 10.0), ('discovered_by', 4.0),
+           ('appearance', 2.0), ('description', 1.0), ('uses', 1.0),
+           ('sources', 0.5))
+
+# what surrounds matched terms in snippets, and the length of a snippet in tokens
+HIGHLIGHT = ('<mark>', '</mark>')
+SNIPPET_TOKENS = 16
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def rebuild_index():
+    """Re-index every element from the current contents of api_element."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    """
+    The FTS5 query matching elements containing every word of `query`, the
+    last one as a prefix of a word (so results show up while typing), or
+    None if `query` has no words.
+    """
+    words = TOKEN_RE.findall(query)
+    if not words:
+        return None
+    # quoted so words like AND, OR, NEAR or column names are not operators
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(query, limit=20):
+    """
+    Up to `limit` elements matching `query`, best first, as dicts of
+    atomic_number, symbol, name, score (higher is better) and a snippet of
+    the best-matching column with the matched words highlighted.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    weights = ', '.join(str(weight) for _, weight in COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT e.atomic_number, e.symbol, e.name, "
+            f"snippet({TABLE}, -1, %s, %s, '…', %s), bm25({TABLE}, {weights}) AS rank "
+            f"FROM {TABLE} JOIN api_element e ON e.atomic_number = {TABLE}.rowid "
+            f"WHERE {TABLE} MATCH %s ORDER BY rank LIMIT %s",
+            [*HIGHLIGHT, SNIPPET_TOKENS, expression, limit])
+        rows = cursor.fetchall()
+    return [{'atomic_number': number, 'symbol': symbol, 'name': name,
+             'score': -rank, 'snippet': snippet}
+            for number, symbol, name, snippet, rank in rows]
@@ -1,36 +1,107 @@
+import copy
+import functools
+import time
+
 from django.db.models import Model
 from rest_framework import serializers
-from api.models import Element, Isotope
+
+from api import metrics
+from api.models import Block, CrystalStructure, Element, Group, Isotope, Period
+
+# fields holding bound child fields, which must be copied along with them
+NESTED_FIELDS = (serializers.BaseSerializer, serializers.ManyRelatedField)
 
 
 class DynamicFieldsModelSerializer(serializers.ModelSerializer):
     """
-    A ModelSerializer that takes an additional `fields` argument that
-    controls which fields should be displayed.
+    A ModelSerializer that can be narrowed to the fields a request asks for.
+
+    Use `for_fields()` to get a serializer class compiled for a given
+    projection; its fields are built once per class and then copied.
+    `expanded()` adds the nested relations named in `expandable_fields`.
     """
+    expandable_fields = {}
+
+    def to_representation(self, instance):
+        # timed per instance so that queries run by a list are not included
+        timings = metrics.current()
+        if timings is None:
+            return super().to_representation(instance)
+        begin = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.add('serialize', time.perf_counter() - begin)
+
+    def get_fields(self):
+        cls = self.__class__
+        if '_compiled_fields' not in cls.__dict__:
+            cls._compiled_fields = super().get_fields()
+        # binding only sets attributes on the copy, so a shallow one will do
+        # except for fields that have already bound children of their own
+        return {name: copy.deepcopy(field) if isinstance(field, NESTED_FIELDS)
+                else copy.copy(field)
+                for name, field in cls._compiled_fields.items()}
+
+    @classmethod
+    def for_fields(cls, fields):
+        """Return a subclass of `cls` restricted to `fields`."""
+        return _projected_serializer(
+            cls, tuple(name for name in cls.Meta.fields if name in set(fields)))
+
+    @classmethod
+    def expanded(cls, names):
+        """Return a subclass of `cls` embedding the relations in `names`."""
+        return _expanded_serializer(cls, tuple(sorted(names)))
+
 
-    def __init__(self, *args, **kwargs):
-        # Instantiate the superclass normally
-        super(DynamicFieldsModelSerializer, self).__init__(*args, **kwargs)
+@functools.lru_cache(maxsize=256)
+def _projected_serializer(serializer_class, fields):
+    meta = serializer_class.Meta
+    read_only_fields = getattr(meta, 'read_only_fields', ())
+    Meta = type('Meta', (meta,), {
+        'fields': fields,
+        'read_only_fields': [f for f in read_only_fields if f in fields]
+    })
+    return type(serializer_class.__name__, (serializer_class,),
+                {'Meta': Meta, '__module__': serializer_class.__module__})
 
-        fields = self.context['request'].query_params.get('fields')
-        if fields:
-            fields = fields.split(',')
-            # Drop any fields that are not specified in the `fields` argument.
-            allowed = set(fields)
-            existing = set(self.fields.keys())
-            for field_name in existing - allowed:
-                self.fields.pop(field_name)
 
+@functools.lru_cache(maxsize=256)
+def _expanded_serializer(serializer_class, names):
+    attrs = {name: serializer_class.expandable_fields[name]() for name in names}
+    attrs['Meta'] = type('Meta', (serializer_class.Meta,), {
+        'fields': (*serializer_class.Meta.fields, *names)
+    })
+    attrs['__module__'] = serializer_class.__module__
+    return type(serializer_class.__name__, (serializer_class,), attrs)
 
 
 def all_fields(model):
+    # reverse relations are only embedded on request and foreign keys are
+    # exposed under their field name, not their `_id` attribute
+    hidden = {rel.get_accessor_name() for rel in model._meta.related_objects}
+    hidden |= {f.attname for f in model._meta.concrete_fields if f.attname != f.name}
     return [symbol for symbol in dir(model)
             if not symbol.startswith('_') and symbol not in dir(Model)
-            and symbol not in ('DoesNotExist', 'MultipleObjectsReturned')]
+            and symbol not in ('DoesNotExist', 'MultipleObjectsReturned', 'Meta')
+            and symbol not in hidden]
+
+
+class NestedIsotopeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Isotope
+        fields = all_fields(Isotope)
+        read_only_fields = all_fields(Isotope)
 
 
 class ElementSerializer(DynamicFieldsModelSerializer):
+    expandable_fields = {
+        'isotopes': lambda: NestedIsotopeSerializer(many=True, read_only=True),
+        'oxidation_states': lambda: serializers.SlugRelatedField(
+            many=True, read_only=True, slug_field='state'),
+    }
+
     class Meta:
         model = Element
         fields = all_fields(Element)
@@ -43,3 +114,44 @@ class IsotopeSerializer(DynamicFieldsModelSerializer):
         fields = all_fields(Isotope)
         read_only_fields = all_fields(Isotope)
 
+
+class CrystalStructureSerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = CrystalStructure
+        fields = all_fields(CrystalStructure)
+        read_only_fields = all_fields(CrystalStructure)
+
+
+class MembersSerializer(DynamicFieldsModelSerializer):
+    """
+    Lists the symbols of the member elements, looked up in the `members`
+    mapping the view puts in the context so a whole page costs one query.
+    """
+    elements = serializers.SerializerMethodField()
+
+    def get_elements(self, obj):
+        return self.context['members'].get(obj.pk, [])
+
+
+class GroupSerializer(MembersSerializer):
+    class Meta:
+        model = Group
+        fields = (*all_fields(Group), 'elements')
+        read_only_fields = ('elements',)
+
+
+class PeriodSerializer(MembersSerializer):
+    class Meta:
+        model = Period
+        fields = (*all_fields(Period), 'elements')
+        read_only_fields = ('elements',)
+
+
+class BlockSerializer(MembersSerializer):
+    def get_elements(self, obj):
+        return self.context['members'].get(obj.name, [])
+
+    class Meta:
+        model = Block
+        fields = (*all_fields(Block), 'elements')
+        read_only_fields = ('elements',)
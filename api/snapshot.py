@@ -0,0 +1,219 @@
+"""Immutable in-memory snapshot of the element and isotope tables.
+
+The data only changes when ``populate_db`` runs or is written through the
+API, both of which bump the dataset version, so in snapshot mode (``settings.API_SNAPSHOT``) the
+tables are loaded once into compact tuples with prebuilt indexes and list,
+retrieve and filter requests are answered without touching the database.
+Numeric properties are also kept presorted so that range and nearest-value
+queries are answered by binary search. The snapshot is reloaded whenever the
+dataset version changes.
+"""
+import bisect
+import operator
+
+from types import MappingProxyType
+
+from django_filters.constants import EMPTY_VALUES
+
+from api import dataset
+from api.models import INDEXED_PROPERTIES, Element, Isotope
+
+LOOKUPS = {
+    'exact': operator.eq,
+    'gte': operator.ge,
+    'lte': operator.le,
+    'gt': operator.gt,
+    'lt': operator.lt,
+    'in': lambda value, values: value in values,
+    'range': lambda value, bounds: bounds[0] <= value <= bounds[1],
+}
+
+
+class SortedIndex:
+    """Non-null values of a column in ascending order with their row numbers."""
+
+    def __init__(self, rows, position):
+        pairs = sorted((row[position], i) for i, row in enumerate(rows)
+                       if row[position] is not None)
+        self.values = tuple(value for value, _ in pairs)
+        self.rows = tuple(i for _, i in pairs)
+
+    def slice(self, lookup, value):
+        """Row numbers matching a ``gte``/``lte``/``gt``/``lt``/``range`` lookup."""
+        if lookup == 'range':
+            lower, upper = value
+            start = bisect.bisect_left(self.values, lower)
+            stop = bisect.bisect_right(self.values, upper)
+        elif lookup in ('gte', 'gt'):
+            find = bisect.bisect_left if lookup == 'gte' else bisect.bisect_right
+            start, stop = find(self.values, value), len(self.values)
+        else:
+            find = bisect.bisect_right if lookup == 'lte' else bisect.bisect_left
+            start, stop = 0, find(self.values, value)
+        return self.rows[start:stop]
+
+    def nearest(self, value, k):
+        """Row numbers of the `k` values closest to `value`, closest first."""
+        values = self.values
+        hi = bisect.bisect_left(values, value)
+        lo = hi - 1
+        result = []
+        while len(result) < k and (lo >= 0 or hi < len(values)):
+            if hi >= len(values) or (lo >= 0 and value - values[lo] <= values[hi] - value):
+                result.append(self.rows[lo])
+                lo -= 1
+            else:
+                result.append(self.rows[hi])
+                hi += 1
+        return result
+
+
+class Table:
+    """
+    Frozen rows of a single model with hash indexes on selected columns and
+    sorted indexes on `ordered` columns.
+    """
+
+    def __init__(self, model, columns, rows, indexed=(), ordered=()):
+        self.model = model
+        self.columns = tuple(columns)
+        self.positions = MappingProxyType(
+            {column: i for i, column in enumerate(self.columns)})
+        self.rows = tuple(tuple(row) for row in rows)
+        self.key = model._meta.pk.name
+        self.indexes = MappingProxyType({
+            column: self._build_index(column)
+            for column in {self.key, *indexed}
+        })
+        self.sorted_indexes = MappingProxyType({
+            column: SortedIndex(self.rows, self.positions[column])
+            for column in ordered if column in self.positions
+        })
+
+    def _build_index(self, column):
+        position = self.positions[column]
+        index = {}
+        for i, row in enumerate(self.rows):
+            index.setdefault(row[position], []).append(i)
+        return MappingProxyType({k: tuple(v) for k, v in index.items()})
+
+    @classmethod
+    def from_queryset(cls, queryset, columns, indexed=(), ordered=()):
+        return cls(queryset.model, columns,
+                   queryset.values_list(*columns), indexed, ordered)
+
+    def get(self, pk):
+        """Return the row with primary key `pk` or None."""
+        matches = self.indexes[self.key].get(pk, ())
+        return self.rows[matches[0]] if matches else None
+
+    def filter(self, lookups):
+        """Return the rows matching every ``(column, lookup): value`` pair.
+
+        Exact and ``in`` matches on indexed columns are resolved from the
+        indexes and comparisons on ordered columns by binary search, the
+        remaining lookups are applied to the (already narrowed) candidates.
+        """
+        candidates = None
+        remaining = []
+        for (column, lookup), value in lookups.items():
+            if lookup in ('exact', 'in') and column in self.indexes:
+                index = self.indexes[column]
+                values = value if lookup == 'in' else (value,)
+                matches = {i for v in values for i in index.get(v, ())}
+            elif lookup != 'exact' and column in self.sorted_indexes:
+                matches = set(self.sorted_indexes[column].slice(lookup, value))
+            else:
+                matches = None
+            if matches is not None:
+                candidates = (matches if candidates is None
+                              else candidates & matches)
+            else:
+                remaining.append((self.positions[column],
+                                  LOOKUPS[lookup], value))
+
+        if candidates is None:
+            rows = self.rows
+        else:
+            rows = [self.rows[i] for i in sorted(candidates)]
+
+        for position, compare, value in remaining:
+            rows = [row for row in rows if row[position] is not None
+                    and compare(row[position], value)]
+        return rows
+
+    def nearest(self, column, value, k):
+        """Return the `k` rows whose `column` is closest to `value`."""
+        return [self.rows[i] for i in self.sorted_indexes[column].nearest(value, k)]
+
+    def records(self, rows, fields=None):
+        """Convert rows into dictionaries, keeping only `fields` if given."""
+        columns = [c for c in self.columns if not fields or c in fields]
+        positions = [self.positions[c] for c in columns]
+        return [dict(zip(columns, [row[p] for p in positions]))
+                for row in rows]
+
+
+class Snapshot:
+    """Point-in-time copy of the element and isotope tables."""
+
+    def __init__(self, version):
+        from api.serializers import ElementSerializer, IsotopeSerializer
+
+        self.version = version
+        self.tables = MappingProxyType({
+            Element: Table.from_queryset(
+                Element.objects.order_by('atomic_number'),
+                model_fields(ElementSerializer),
+                indexed=('symbol', 'name', 'period', 'group'),
+                ordered=INDEXED_PROPERTIES),
+            Isotope: Table.from_queryset(
+                Isotope.objects.all(),
+                model_fields(IsotopeSerializer),
+                indexed=('element',)),
+        })
+
+    def table(self, model):
+        return self.tables[model]
+
+
+def model_fields(serializer_class):
+    """Concrete model columns exposed by `serializer_class`."""
+    model = serializer_class.Meta.model
+    columns = {field.name for field in model._meta.concrete_fields}
+    return [name for name in serializer_class.Meta.fields if name in columns]
+
+
+def filter_lookups(filterset):
+    """
+    Cleaned values of a valid FilterSet keyed by ``(field, lookup)``,
+    converted to the Python type of the model field (numeric filters are
+    cleaned to Decimal, which does not compare equal to float columns).
+    """
+    cleaned_data = filterset.form.cleaned_data
+    fields = filterset._meta.model._meta
+    lookups = {}
+    for name, f in filterset.filters.items():
+        value = cleaned_data.get(name)
+        if value in EMPTY_VALUES:
+            continue
+        to_python = fields.get_field(f.field_name).to_python
+        if isinstance(value, (list, tuple)):  # `in` and `range`
+            value = tuple(to_python(v) for v in value)
+        else:
+            value = to_python(value)
+        lookups[f.field_name, f.lookup_expr] = value
+    return lookups
+
+
+_snapshot = dataset.VersionedValue(Snapshot)
+
+
+def current_snapshot():
+    """Return the loaded snapshot if it is up to date, without loading it."""
+    return _snapshot.current()
+
+
+def get_snapshot():
+    """Return the current snapshot, (re)loading it if the data changed."""
+    return _snapshot.get()
@@ -0,0 +1,85 @@
+"""Aggregates of numeric element properties per group, period or block."""
+import functools
+
+import numpy as np
+from django.db import models
+
+from api import dataset
+from api.models import Element
+
+# how elements can be partitioned, with the value marking "not assigned"
+PARTITIONS = {'group': -1, 'period': -1, 'block': None}
+
+NUMERIC_PROPERTIES = tuple(
+    field.name for field in Element._meta.concrete_fields
+    if isinstance(field, (models.FloatField, models.IntegerField))
+    and not field.primary_key and field.name not in PARTITIONS)
+
+
+class PropertyStats:
+    """
+    Numeric element properties held as one float matrix (NaN where a value
+    is missing) with the group, period and block of each row, from which
+    count/min/max/mean/std per partition are computed in a few vectorized
+    passes and memoized.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        rows = Element.objects.order_by('atomic_number') \
+            .values_list(*PARTITIONS, *NUMERIC_PROPERTIES)
+        columns = list(zip(*rows)) or [()] * (len(PARTITIONS) + len(NUMERIC_PROPERTIES))
+        self.partitions = {name: np.array(column, dtype=object)
+                           for name, column in zip(PARTITIONS, columns)}
+        self.matrix = np.array(columns[len(PARTITIONS):], dtype=float) \
+            .T.reshape(len(rows), len(NUMERIC_PROPERTIES))
+        self.columns = {name: i for i, name in enumerate(NUMERIC_PROPERTIES)}
+        self.aggregate = functools.lru_cache(maxsize=256)(self._aggregate)
+
+    def _aggregate(self, by, properties=NUMERIC_PROPERTIES):
+        """
+        Return ``{key: {property: {count, min, max, mean, std}}}`` for the
+        elements sharing each `by` value ('group', 'period' or 'block').
+        Missing values are skipped; std is the population standard deviation.
+        """
+        keys = self.partitions[by]
+        assigned = keys != PARTITIONS[by]
+        labels, inverse = np.unique(keys[assigned], return_inverse=True)
+        values = self.matrix[assigned][:, [self.columns[name] for name in properties]]
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+        shape = (len(labels), len(properties))
+
+        counts = np.zeros(shape)
+        np.add.at(counts, inverse, present)
+        sums = np.zeros(shape)
+        np.add.at(sums, inverse, filled)
+        mins = np.full(shape, np.nan)
+        np.fmin.at(mins, inverse, values)
+        maxs = np.full(shape, np.nan)
+        np.fmax.at(maxs, inverse, values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+            deviations = np.where(present, values - means[inverse], 0.0)
+            squares = np.zeros(shape)
+            np.add.at(squares, inverse, deviations ** 2)
+            stds = np.sqrt(squares / counts)
+
+        stats = np.stack([mins, maxs, means, stds], axis=-1).tolist()
+        result = {}
+        for i, label in enumerate(labels.tolist()):
+            result[label] = {}
+            for j, name in enumerate(properties):
+                count = int(counts[i, j])
+                low, high, mean, std = stats[i][j] if count else (None,) * 4
+                result[label][name] = {'count': count, 'min': low, 'max': high,
+                                       'mean': mean, 'std': std}
+        return result
+
+
+_stats = dataset.VersionedValue(PropertyStats)
+
+
+def get_property_stats():
+    """Return the property stats, rebuilding them when the dataset changes."""
+    return _stats.get()
@@ -1,3 +1,1095 @@
-from django.test import TestCase
+import contextlib
+import functools
+import gzip
+import http.server
+import io
+import json
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+import crystals
+import numpy as np
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+
+from api import benchmark, dataset
+from api.models import (
+    Block, CrystalStructure, Element, Group, IonisationEnergies, Isotope,
+    OxidationState, Period
+)
+from api.serializers import ElementSerializer
+from parsers.crystals_serialiser import CrystalSerialiser
+from parsers import crystals_serialiser, pub_chem, values
+from api import metrics, search
+from api.cache import response_cache
+from api.chemistry import FormulaError, parse_formula
+from api.diffraction import powder_pattern
+from api.snapshot import get_snapshot
+from api.views import ElementViewSet, IsotopeViewSet
+
+ELEMENTS_JSON = {
+    "1": {
+        "symbol": "H", "name": "Hydrogen", "period": "1", "group": "1",
+        "atomic_weight": "1.008", "density": "0.08988 g/L",
+        "melting_point": "13.99 K", "boiling_point": "-252.87 °C",
+        "covalent_atomic_radius": "31",
+        "electron_configuration": "1s1", "ground_level": "2S1/2",
+        "oxidation_states": ["+1", "-1"],
+        "isotopes": {
+            "1H": {"abundance": 0.999885, "discovered": 1920,
+                   "atomic_mass": "1.00782503223 ± 0.00000000009",
+                   "halflife": "Stable", "decay_modes": "IS=99.9885±0.0070%"},
+            "2H": {"abundance": 0.000115, "discovered": 1932,
+                   "atomic_mass": "2.01410177812 ± 0.00000000012",
+                   "halflife": "Stable", "decay_modes": "IS=0.0115±0.0070%"},
+        },
+    },
+    "2": {
+        "symbol": "He", "name": "Helium", "period": "1", "group": "18",
+        "atomic_weight": "4.002602", "density": "0.1786 g/L",
+        "electron_configuration": "1s2", "ground_level": "1S0",
+        "isotopes": {
+            "3He": {"abundance": 0.000002, "discovered": 1939,
+                    "atomic_mass": "3.0160293201 ± 0.0000000025",
+                    "halflife": "Stable", "decay_modes": "IS=0.0002±0.0002%"},
+            "4He": {"abundance": 0.999998, "discovered": 1908,
+                    "atomic_mass": "4.00260325413 ± 0.00000000016",
+                    "halflife": "Stable", "decay_modes": "IS=99.9998±0.0002%"},
+        },
+    },
+}
+
+
+def write_elements_json(test_case, elements=ELEMENTS_JSON):
+    """Write `elements` to a temporary file removed after `test_case`."""
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(elements, f)
+    test_case.addCleanup(os.remove, f.name)
+    return f.name
+
+
+class IsotopeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for isotope in ('54Fe', '56Fe', '57Fe', '58Fe', '16O', '17O'):
+            Isotope.objects.create(isotope=isotope)
+
+    def test_nuclide_columns(self):
+        iron = Isotope.objects.get(isotope='56Fe')
+        self.assertEqual(iron.element, 'Fe')
+        self.assertEqual(iron.mass_number, 56)
+        self.assertEqual(iron.neutrons, 30)
+
+    def test_element_filter(self):
+        response = self.client.get('/api/isotopes/?element=Fe&neutrons__gte=31')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(row['isotope'] for row in response.json()),
+                         ['57Fe', '58Fe'])
+
+    def test_keyset_pagination(self):
+        seen = []
+        url = '/api/isotopes/?page_size=4&fields=isotope'
+        while url:
+            with self.assertNumQueries(1):
+                page = self.client.get(url).json()
+            seen += [row['isotope'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(seen, sorted(Isotope.objects.values_list('isotope', flat=True)))
+        with override_settings(API_SNAPSHOT=True):
+            page = self.client.get('/api/isotopes/?page_size=2&element=O').json()
+        self.assertEqual([row['isotope'] for row in page['results']], ['16O', '17O'])
+
+    def test_ndjson_stream(self):
+        response = self.client.get('/api/isotopes/?element=Fe&format=ndjson')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([r['isotope'] for r in records], ['54Fe', '56Fe', '57Fe', '58Fe'])
+        self.assertEqual(records[1]['neutrons'], 30)
+
+        response = self.client.get('/api/isotopes/56Fe/?format=ndjson')
+        self.assertEqual(json.loads(response.content)['isotope'], '56Fe')
+
+
+class DatasetVersionMixin:
+    """Point the dataset version stamp at a temporary file per test."""
+
+    def setUp(self):
+        super().setUp()
+        version_file = tempfile.NamedTemporaryFile(delete=False)
+        version_file.close()
+        self.addCleanup(os.remove, version_file.name)
+        settings = override_settings(DATASET_VERSION_FILE=version_file.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        dataset.bump_version()
+
+
+class SnapshotTests(DatasetVersionMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Element.objects.create(atomic_number=1, name='Hydrogen', symbol='H',
+                               group=1, period=1, atomic_mass=1.008)
+        Element.objects.create(atomic_number=2, name='Helium', symbol='He',
+                               group=18, period=1, atomic_mass=4.0026)
+        Element.objects.create(atomic_number=3, name='Lithium', symbol='Li',
+                               group=1, period=2, atomic_mass=6.94)
+        for isotope in ('1H', '2H', '3He', '4He', '7Li'):
+            Isotope.objects.create(isotope=isotope)
+
+    def get(self, url):
+        response = self.client.get(url)
+        response_cache.clear()
+        with override_settings(API_SNAPSHOT=True):
+            get_snapshot()  # warm up
+            with self.assertNumQueries(0):
+                snapshot_response = self.client.get(url)
+        self.assertEqual(response.status_code, snapshot_response.status_code)
+        self.assertEqual(response.json(), snapshot_response.json())
+        return snapshot_response
+
+    def test_matches_database(self):
+        for url in ('/api/elements/',
+                    '/api/elements/?period=1&fields=symbol,name',
+                    '/api/elements/?group=1&symbol=Li',
+                    '/api/elements/?symbol__in=H,Li,Xx&fields=name',
+                    '/api/elements/?atomic_number__in=2,3&period=2',
+                    '/api/elements/?atomic_mass__gte=4.0026&fields=symbol',
+                    '/api/elements/?atomic_mass__range=1,5&period=1',
+                    '/api/elements/?atomic_mass__lte=4&atomic_mass__gte=7',
+                    '/api/elements/2/?fields=symbol,atomic_mass',
+                    '/api/elements/99/',
+                    '/api/isotopes/?element=He',
+                    '/api/isotopes/?neutrons__gte=1&fields=isotope',
+                    '/api/isotopes/?isotope__in=1H,7Li',
+                    '/api/isotopes/7Li/'):
+            with self.subTest(url=url):
+                self.get(url)
+
+    def test_decimal_boundaries(self):
+        # filter values are cleaned to Decimal; the boundary rows must match
+        for query, symbols in (('atomic_mass=1.008', ['H']),
+                               ('atomic_mass__lte=4.0026', ['H', 'He']),
+                               ('atomic_mass__range=1.008,4.0026', ['H', 'He']),
+                               ('atomic_mass__gte=4.0026', ['He', 'Li']),
+                               ('atomic_mass__range=6.94,6.94', ['Li'])):
+            with self.subTest(query=query):
+                response = self.get(f'/api/elements/?{query}&fields=symbol')
+                self.assertEqual([row['symbol'] for row in response.json()], symbols)
+
+    def test_invalid_filter(self):
+        self.assertEqual(self.get('/api/elements/?period=x').status_code, 400)
+        self.assertEqual(self.get('/api/elements/?atomic_mass__range=1').status_code, 400)
+
+    def test_nearest(self):
+        for snapshot in (False, True):
+            with self.subTest(snapshot=snapshot), override_settings(API_SNAPSHOT=snapshot):
+                response_cache.clear()
+                url = '/api/elements/nearest/?property=atomic_mass&value=5&k=2&fields=symbol'
+                self.assertEqual(self.client.get(url).json(),
+                                 [{'symbol': 'He'}, {'symbol': 'Li'}])
+                url = '/api/elements/nearest/?property=atomic_mass&value=100&k=10&fields=symbol'
+                self.assertEqual(self.client.get(url).json(),
+                                 [{'symbol': 'Li'}, {'symbol': 'He'}, {'symbol': 'H'}])
+        with self.assertNumQueries(1):
+            url = '/api/elements/nearest/?property=atomic_mass&value=2&k=1'
+            self.assertEqual(self.client.get(url).json()[0]['symbol'], 'H')
+
+        for query in ('property=name&value=5', 'property=atomic_mass&value=nan',
+                      'property=atomic_mass&value=inf', 'property=atomic_mass',
+                      'property=atomic_mass&value=2&k=0',
+                      'property=atomic_mass&value=2&k=9223372036854775808'):
+            response = self.client.get(f'/api/elements/nearest/?{query}')
+            self.assertEqual(response.status_code, 400)
+
+    def test_reloads_when_repopulated(self):
+        with override_settings(API_SNAPSHOT=True):
+            self.assertEqual(len(self.client.get('/api/elements/').json()), 3)
+            Element.objects.filter(atomic_number=3).delete()
+            self.assertEqual(len(self.client.get('/api/elements/').json()), 3)
+            dataset.bump_version()
+            self.assertEqual(len(self.client.get('/api/elements/').json()), 2)
+
+
+class AsyncReadTests(DatasetVersionMixin, TestCase):
+    async_urls = override_settings(ROOT_URLCONF='elements.asgi_urls')
+
+    @classmethod
+    def setUpTestData(cls):
+        Element.objects.create(atomic_number=1, name='Hydrogen', symbol='H',
+                               group=1, period=1, atomic_mass=1.008)
+        Element.objects.create(atomic_number=2, name='Helium', symbol='He',
+                               group=18, period=1, atomic_mass=4.0026)
+        for isotope in ('1H', '2H', '3He', '4He'):
+            Isotope.objects.create(isotope=isotope)
+
+    def setUp(self):
+        super().setUp()
+        response_cache.clear()
+
+    def test_matches_viewsets(self):
+        urls = ('/api/elements/', '/api/elements/?period=1&fields=symbol,name',
+                '/api/elements/?atomic_mass__gte=2&fields=symbol',
+                '/api/elements/2/?fields=symbol,atomic_mass', '/api/elements/99/',
+                '/api/elements/?period=x', '/api/elements/?expand=isotopes',
+                '/api/elements/nearest/?property=atomic_mass&value=2',
+                '/api/isotopes/?element=He', '/api/isotopes/4He/',
+                '/api/isotopes/?page_size=2', '/api/isotopes/5He/')
+        for snapshot in (False, True):
+            for url in urls:
+                with self.subTest(url=url, snapshot=snapshot), \
+                        override_settings(API_SNAPSHOT=snapshot):
+                    response = self.client.get(url)
+                    response_cache.clear()
+                    with self.async_urls:
+                        async_response = self.client.get(url)
+                    response_cache.clear()
+                    self.assertEqual(response.status_code, async_response.status_code)
+                    self.assertEqual(response.content, async_response.content)
+
+    def test_snapshot_reads_without_queries(self):
+        with self.async_urls, override_settings(API_SNAPSHOT=True):
+            get_snapshot()  # warm up
+            with self.assertNumQueries(0):
+                response = self.client.get('/api/isotopes/?element=H&fields=isotope')
+        self.assertEqual(response.json(), [{'isotope': '1H'}, {'isotope': '2H'}])
+
+    async def test_asgi_request(self):
+        url = '/api/elements/?period=1&fields=symbol'
+        with self.async_urls:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.json(), [{'symbol': 'H'}, {'symbol': 'He'}])
+            response = await self.async_client.get(
+                url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+class QueryCountTests(DatasetVersionMixin, TestCase):
+    """Every element and isotope read path costs one query, or none from the snapshot."""
+
+    def setUp(self):
+        super().setUp()
+        response_cache.clear()
+        call_command('populate_db', '--bulk', '--input',
+                     write_elements_json(self, benchmark.fixture_elements(3)),
+                     verbosity=0, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_read_paths(self):
+        cases = list(benchmark.api_cases())
+        filters = sum(len(lookups) for viewset in (ElementViewSet, IsotopeViewSet)
+                      for lookups in viewset.filterset_fields.values())
+        self.assertEqual(len(cases), 6 + filters)
+        for snapshot, queries in ((False, 1), (True, 0)):
+            with override_settings(API_SNAPSHOT=snapshot):
+                get_snapshot()
+                for name, url in cases:
+                    with self.subTest(name=name, snapshot=snapshot), \
+                            self.assertNumQueries(queries):
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    response_cache.clear()
+
+    def test_measure_and_compare(self):
+        result = benchmark.measure_request(self.client, '/api/elements/26/', requests=3)
+        self.assertEqual((result['status'], result['queries']), (200, 1))
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertGreater(result['peak_kib'], 0)
+
+        baseline = {'results': [{'name': 'retrieve', **result}]}
+        slower = dict(result, name='retrieve', p50_ms=3 * result['p50_ms'], queries=2)
+        self.assertEqual(benchmark.compare([slower], baseline),
+                         [('retrieve', 'p50_ms', result['p50_ms'], slower['p50_ms']),
+                          ('retrieve', 'queries', 1, 2)])
+        self.assertEqual(benchmark.compare([dict(result, name='retrieve')], baseline), [])
+
+    def test_fixture_positions(self):
+        self.assertEqual(benchmark.element_position(2), (1, 18))
+        self.assertEqual(benchmark.element_position(58), (6, None))
+        self.assertEqual(benchmark.element_position(71), (6, 3))
+        self.assertEqual(Element.objects.get(symbol='Og').block, 'p')
+
+
+class InstrumentationTests(DatasetVersionMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Element.objects.create(atomic_number=1, symbol='H', name='Hydrogen',
+                               period=1, group=1)
+        Element.objects.create(atomic_number=2, symbol='He', name='Helium',
+                               period=1, group=18)
+
+    def setUp(self):
+        super().setUp()
+        response_cache.clear()
+        metrics.registry.clear()
+
+    def phases(self, response):
+        return dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+
+    def test_server_timing(self):
+        response = self.client.get('/api/elements/?group=1&fields=symbol')
+        phases = self.phases(response)
+        self.assertEqual(list(phases), ['db', 'filter', 'serialize', 'view', 'render', 'total'])
+        self.assertIn('desc="1 queries"', phases['db'])
+
+        # answered from the response cache: no SQL, filtering or rendering
+        response = self.client.get('/api/elements/?group=1&fields=symbol')
+        self.assertEqual(list(self.phases(response)), ['view', 'total'])
+
+    async def test_async_server_timing(self):
+        response = await self.async_client.get('/api/elements/1/')
+        self.assertIn('total', self.phases(response))
+
+    def test_metrics(self):
+        self.client.get('/api/elements/?group=1&fields=symbol')
+        self.client.get('/api/elements/?fields=name&group=18')
+        self.client.get('/api/elements/1/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        body = response.content.decode()
+        labels = 'route="element-list",method="GET",params="fields,group"'
+        self.assertIn(f'api_request_phase_seconds_count{{{labels},phase="total"}} 2\n', body)
+        self.assertIn(f'api_request_phase_seconds_bucket{{{labels},phase="db",le="+Inf"}} 2\n',
+                      body)
+        self.assertIn(f'api_db_queries_total{{{labels}}} 2\n', body)
+        self.assertIn('route="element-detail",method="GET",params=""', body)
+
+    def test_series_limit(self):
+        with self.settings(API_METRICS_MAX_SERIES=1):
+            self.client.get('/api/elements/')
+            self.client.get('/api/elements/?symbol=H')
+            self.client.get('/api/elements/?name=Helium')
+        queries = metrics.registry.queries
+        self.assertEqual(set(queries), {('element-list', 'GET', ''),
+                                        ('element-list', 'GET', 'other')})
+        self.assertEqual(queries[('element-list', 'GET', 'other')], 2)
+
+
+class ExpandTests(DatasetVersionMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        call_command('populate_db', '--input', write_elements_json(self), '--bulk',
+                     verbosity=0, stdout=io.StringIO(), stderr=io.StringIO())
+        response_cache.clear()
+
+    def test_expand(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                '/api/elements/?expand=isotopes,oxidation_states&fields=symbol')
+        hydrogen, helium = response.json()
+        self.assertEqual(hydrogen['symbol'], 'H')
+        self.assertEqual(hydrogen['oxidation_states'], [-1, 1])
+        self.assertEqual([iso['isotope'] for iso in hydrogen['isotopes']], ['1H', '2H'])
+        self.assertEqual(hydrogen['isotopes'][1]['atomic_number'], 1)
+        self.assertEqual(helium['oxidation_states'], [])
+
+        # the query count does not grow with the number of rows
+        Element.objects.create(atomic_number=3, name='Lithium', symbol='Li',
+                               group=1, period=2)
+        for isotope in ('6Li', '7Li'):
+            Isotope.objects.create(isotope=isotope)
+        dataset.bump_version()
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/elements/?expand=oxidation_states,isotopes')
+        self.assertEqual(len(response.json()[2]['isotopes']), 2)
+
+        with self.assertNumQueries(2), override_settings(API_SNAPSHOT=True):
+            response = self.client.get('/api/elements/2/?expand=isotopes')
+        self.assertEqual(len(response.json()['isotopes']), 2)
+
+    def test_invalid_expand(self):
+        response = self.client.get('/api/elements/?expand=neighbours')
+        self.assertEqual(response.status_code, 400)
+
+
+class CachedResponseTests(DatasetVersionMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Element.objects.create(atomic_number=1, name='Hydrogen', symbol='H',
+                               group=1, period=1)
+        Element.objects.create(atomic_number=2, name='Helium', symbol='He',
+                               group=18, period=1)
+
+    def test_not_modified(self):
+        response = self.client.get('/api/elements/?fields=symbol')
+        self.assertIn('Last-Modified', response)
+        response = self.client.get('/api/elements/?fields=symbol',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_cache_hit_skips_database(self):
+        first = self.client.get('/api/elements/?period=1&fields=symbol,name')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/elements/?fields=name,symbol&period=1')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_invalidated_by_new_version(self):
+        etag = self.client.get('/api/elements/')['ETag']
+        Element.objects.filter(atomic_number=2).delete()
+        dataset.bump_version()
+        response = self.client.get('/api/elements/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_invalidated_by_write(self):
+        Group.objects.create(number=18, name='Noble gases', description='')
+        etag = self.client.get('/api/groups/18/')['ETag']
+        response = self.client.patch('/api/groups/18/', {'description': 'Inert.'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/groups/18/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['description'], 'Inert.')
+
+        # deleting an element also drops it from the search index
+        search.rebuild_index()
+        self.assertEqual(len(self.client.get('/api/search/?q=helium').json()['results']), 1)
+        self.assertEqual(self.client.delete('/api/elements/2/').status_code, 204)
+        self.assertEqual(len(self.client.get('/api/elements/').json()), 1)
+        self.assertEqual(self.client.get('/api/search/?q=helium').json()['results'], [])
+
+
+class ProjectionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Element.objects.create(atomic_number=1, name='Hydrogen', symbol='H',
+                               group=1, period=1, description='x' * 4000)
+
+    def setUp(self):
+        response_cache.clear()
+
+    def test_only_selects_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/elements/?fields=symbol,name')
+        self.assertEqual(response.json(), [{'name': 'Hydrogen', 'symbol': 'H'}])
+        self.assertNotIn('description', queries.captured_queries[0]['sql'])
+
+    def test_serializer_class_cached_per_projection(self):
+        self.assertIs(ElementSerializer.for_fields(['name', 'symbol']),
+                      ElementSerializer.for_fields(['symbol', 'name', 'foo']))
+        self.assertEqual(ElementSerializer.for_fields(['symbol']).Meta.fields,
+                         ('symbol',))
+
+
+class PopulateDbTests(DatasetVersionMixin, TestCase):
+
+    def populate(self, *args):
+        stdout = io.StringIO()
+        call_command('populate_db', '--input', write_elements_json(self),
+                     *args, verbosity=0, stdout=stdout,
+                     stderr=io.StringIO())
+        return stdout.getvalue()
+
+    def test_row_by_row(self):
+        self.assertIn('Wrote 8 rows', self.populate())
+        self.assertEqual(Isotope.objects.get(isotope='4He').neutrons, 2)
+        hydrogen = Element.objects.get(symbol='H')
+        self.assertAlmostEqual(hydrogen.density_g_per_cm3, 8.988e-05)
+        self.assertAlmostEqual(hydrogen.melting_point_kelvin, 13.99)
+        self.assertAlmostEqual(hydrogen.boiling_point_kelvin, 20.28)
+        self.assertEqual(hydrogen.covalent_atomic_radius_pm, 31)
+
+    def test_bulk_upsert(self):
+        version = dataset.version()
+        self.populate('--bulk', '--batch-size', '2')
+        Element.objects.filter(symbol='He').update(name='Nonsense')
+        output = self.populate('--bulk')
+        self.assertIn('rows/s', output)
+        self.assertEqual(Element.objects.count(), 2)
+        self.assertEqual(Element.objects.get(symbol='He').name, 'Helium')
+        self.assertEqual(Isotope.objects.count(), 4)
+        iso = Isotope.objects.get(isotope='2H')
+        self.assertEqual((iso.element, iso.neutrons), ('H', 1))
+        self.assertEqual(iso.atomic_number.name, 'Hydrogen')
+        self.assertEqual(list(OxidationState.objects.values_list('element', 'state')),
+                         [(1, -1), (1, 1)])
+        self.assertAlmostEqual(iso.atomic_mass, 2.01410177812)
+        self.assertNotEqual(dataset.version(), version)
+        self.assertEqual([r['symbol'] for r in search.search('heli')], ['He'])
+
+
+class SearchTests(DatasetVersionMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number, symbol, name, description, uses in (
+                (26, 'Fe', 'Iron', 'A lustrous, magnetic metal that rusts in moist air.',
+                 'Steel, magnetic cores and cast iron.'),
+                (27, 'Co', 'Cobalt', 'A hard, lustrous, silver-grey metal.',
+                 'Blue pigments, alloys and permanent magnets.'),
+                (29, 'Cu', 'Copper', 'A reddish-orange, ductile metal.',
+                 'Electrical wiring and plumbing.'),
+                (30, 'Zn', 'Zinc', 'A brittle, bluish-white metal.', 'Galvanising steel.'),
+                (34, 'Se', 'Selenium', 'A grey non-metal.', 'Glass and pigments.'),
+                (35, 'Br', 'Bromine', 'A red-brown liquid.', 'Flame retardants.')):
+            Element.objects.create(atomic_number=number, symbol=symbol, name=name,
+                                   period=4, group=number - 18 - (number > 30) * 10,
+                                   description=description, uses=uses)
+        search.rebuild_index()
+
+    def setUp(self):
+        super().setUp()
+        response_cache.clear()
+
+    def test_ranked_results(self):
+        with self.assertNumQueries(1):
+            results = self.client.get('/api/search/?q=magnetic').json()['results']
+        self.assertEqual([r['symbol'] for r in results], ['Fe', 'Co'])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertIn('<mark>magnetic</mark>', results[0]['snippet'])
+
+        # the name is weighted above the descriptions that mention it
+        results = self.client.get('/api/search/?q=iron').json()['results']
+        self.assertEqual(results[0]['name'], 'Iron')
+
+    def test_prefix_and_stemming(self):
+        results = self.client.get('/api/search/?q=lustrous%20me').json()['results']
+        self.assertEqual({r['symbol'] for r in results}, {'Fe', 'Co'})
+        # "magnets" and "magnetic" share the stem "magnet"
+        results = self.client.get('/api/search/?q=magnet%20allo&limit=1').json()['results']
+        self.assertEqual([r['symbol'] for r in results], ['Co'])
+
+    def test_operators_are_words(self):
+        self.assertEqual(search.match_expression('iron OR "cobalt'), '"iron" "OR" "cobalt"*')
+        self.assertEqual(self.client.get('/api/search/?q=copper%20NEAR(').json()['results'],
+                         [])
+
+    def test_uses_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN SELECT rowid FROM {search.TABLE} "
+                           f"WHERE {search.TABLE} MATCH %s", ['"metal"*'])
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('VIRTUAL TABLE INDEX', plan)
+
+    def test_invalid_parameters(self):
+        for query in ('', '?q=', '?q=%20*%22', '?q=iron&limit=0', '?q=iron&limit=x',
+                      '?q=iron&limit=%C2%B2'):
+            response = self.client.get(f'/api/search/{query}')
+            self.assertEqual(response.status_code, 400)
+
+
+class BuildArtifactTests(DatasetVersionMixin, TransactionTestCase):
+    # VACUUM cannot run inside the transaction wrapping a TestCase
+
+    def test_build(self):
+        Element.objects.create(atomic_number=1, name='Hydrogen', symbol='H',
+                               group=1, period=1, atomic_mass=1.008)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'elements.sqlite3')
+        versions = []
+        for _ in range(2):  # rebuilding replaces the artifact
+            output = io.StringIO()
+            call_command('build_artifact', path, stdout=output)
+            dataset.artifact_version.cache_clear()
+            versions.append(dataset.artifact_version(path))
+        self.assertIn('KiB', output.getvalue())
+        self.assertEqual(os.listdir(directory), ['elements.sqlite3'])
+        self.assertLess(0, versions[0])
+        self.assertLess(versions[0], versions[1])
+
+        # a serving process keeps the version of the artifact it started with
+        dataset.artifact_version.cache_clear()
+        self.addCleanup(dataset.artifact_version.cache_clear)
+        with self.settings(DATABASE_ARTIFACT=path):
+            version = dataset.version()
+            call_command('build_artifact', path, stdout=io.StringIO())
+            self.assertEqual(dataset.version(), version)
+        self.assertEqual(version, versions[1])
+
+        db = sqlite3.connect(f'file:{path}?mode=ro&immutable=1', uri=True)
+        self.addCleanup(db.close)
+        self.assertEqual(db.execute('SELECT symbol FROM api_element').fetchall(),
+                         [('H',)])
+        self.assertTrue(db.execute('SELECT count(*) FROM sqlite_stat1').fetchone()[0])
+        with self.assertRaises(sqlite3.OperationalError):
+            db.execute("DELETE FROM api_element")
+
+
+class ExportStaticApiTests(DatasetVersionMixin, TestCase):
+
+    def test_export(self):
+        call_command('populate_db', '--input', write_elements_json(self),
+                     verbosity=0, stdout=io.StringIO(), stderr=io.StringIO())
+        output = os.path.join(tempfile.mkdtemp(), 'static')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        # left behind by an interrupted export
+        os.makedirs(os.path.join(output + '.old', 'api'))
+        releases = []
+        for _ in range(2):  # re-exporting swaps the link to a new tree
+            call_command('export_static_api', '--output', output,
+                         '--projection', 'elements:symbol,name',
+                         stdout=io.StringIO(), stderr=io.StringIO())
+            self.assertTrue(os.path.islink(output))
+            releases.append(os.readlink(output))
+        self.assertNotEqual(releases[0], releases[1])
+        self.assertEqual(sorted(os.listdir(os.path.dirname(output))),
+                         sorted(['static', releases[1]]))
+
+        with open(os.path.join(output, 'manifest.json')) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest['version'], dataset.version())
+        entry = manifest['files']['/api/elements/?fields=name,symbol']
+        self.assertEqual(entry['path'], 'api/elements/fields=name,symbol.json')
+        with gzip.open(os.path.join(output, entry['encodings']['gzip'])) as f:
+            self.assertEqual(json.load(f), [{'name': 'Hydrogen', 'symbol': 'H'},
+                                            {'name': 'Helium', 'symbol': 'He'}])
+
+        entry = manifest['files']['/api/isotopes/4He/']
+        with open(os.path.join(output, entry['path']), 'rb') as f:
+            content = f.read()
+        response = self.client.get('/api/isotopes/4He/')
+        self.assertEqual(content, response.content)
+        self.assertEqual(entry['etag'], response['ETag'])
+
+
+class StructureTests(DatasetVersionMixin, TestCase):
+
+    def test_populate_and_serve(self):
+        for _ in range(2):  # re-running upserts
+            call_command('populate_structures', 'Fe', 'GaAs', '--processes', '2',
+                         verbosity=0, stdout=io.StringIO())
+        self.assertEqual(CrystalStructure.objects.count(), 2)
+
+        iron = self.client.get('/api/structures/Fe/').json()
+        self.assertEqual((iron['lattice_system'], iron['symmetry'],
+                          iron['space_group_number']), ('cubic', 'Im-3m', 229))
+        self.assertAlmostEqual(iron['volume'], iron['a'] ** 3)
+        np.testing.assert_allclose(
+            np.array(iron['lattice_vectors']) @ np.array(iron['reciprocal_vectors']).T,
+            2 * np.pi * np.eye(3), atol=1e-9)
+        self.assertEqual(len(iron['atoms']), 2)
+
+        response = self.client.get('/api/structures/?volume__gte=100&fields=name')
+        self.assertEqual(response.json(), [{'name': 'GaAs'}])
+
+        response_cache.clear()
+        url = '/api/structures/Fe/diffraction/?max_two_theta=90'
+        with self.assertNumQueries(1):
+            pattern = self.client.get(url).json()
+        self.assertEqual([peak['hkl'] for peak in pattern['peaks']],
+                         [[1, 1, 0], [2, 0, 0], [2, 1, 1]])
+        self.assertAlmostEqual(pattern['peaks'][0]['two_theta'], 44.67, places=2)
+        self.assertAlmostEqual(pattern['peaks'][0]['intensity'], 100)
+        self.assertEqual(pattern['peaks'][0]['multiplicity'], 12)
+        response_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json(), pattern)
+
+        response = self.client.get('/api/structures/Fe/diffraction/?wavelength=0')
+        self.assertEqual(response.status_code, 400)
+        # about 10⁹ (hkl) candidates, rejected before any are generated
+        response = self.client.get('/api/structures/Fe/diffraction/?wavelength=0.01')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('candidates', response.json()['wavelength'][0])
+        response = self.client.get('/api/structures/Xx/diffraction/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_coincident_reflections(self):
+        # in a primitive cubic cell (300) and (221) share d = a/3 but are not
+        # equivalent, so they are separate peaks with their own multiplicity
+        a = 3.35
+        peaks = powder_pattern(2 * np.pi / a * np.eye(3), [['Po', 0, 0, 0, 1]],
+                               max_two_theta=120)
+        coincident = [(peak['hkl'], peak['multiplicity']) for peak in peaks
+                      if abs(peak['d_spacing'] - a / 3) < 1e-9]
+        self.assertEqual(coincident, [([3, 0, 0], 6), ([2, 2, 1], 24)])
+        self.assertEqual([peak['multiplicity'] for peak in peaks[:3]], [6, 12, 8])
+
+
+class CrystalSerialiserTests(SimpleTestCase):
+
+    def test_serialise(self):
+        crystal = crystals.Crystal.from_database('GaAs')
+        data = json.loads(json.dumps(CrystalSerialiser.serialise(crystal)))
+        self.assertEqual(data['lattice_system'], 'cubic')
+        self.assertEqual(data['lattice_parameters']['a'], 5.6537)
+        self.assertEqual((data['international_number'], data['centering']),
+                         (216, 'face_centered'))
+        self.assertEqual(data['symmetry']['international_symbol'], 'F-43m')
+        self.assertEqual(len(data['unitcell']), 8)
+        self.assertEqual(data['unitcell'][0]['lattice']['lattice_system'], 'cubic')
+        self.assertNotIn('element_full', data['unitcell'][0])
+
+        # space-group properties are read from a single symmetry() call, and
+        # serialising again gives the same result
+        with mock.patch('parsers.crystals_serialiser.symmetry',
+                        wraps=crystals_serialiser.symmetry) as symmetry:
+            again = json.loads(json.dumps(CrystalSerialiser.serialise(crystal)))
+        symmetry.assert_called_once()
+        self.assertEqual(again, data)
+
+
+class IonisationEnergiesTests(DatasetVersionMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        response_cache.clear()
+        for number, symbol in enumerate(('H', 'He', 'Li'), start=1):
+            Element.objects.create(atomic_number=number, name=symbol, symbol=symbol,
+                                   group=1, period=1)
+        path = os.path.join(tempfile.mkdtemp(), 'ionisation_energies.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, 'w') as f:
+            json.dump({'H': [1312.0], '2': [2372.3, '5250.5'],
+                       'Li': [520.2, 7298.1, 11815.0], 'Og': [839.4]}, f)
+        for _ in range(2):  # re-running upserts
+            call_command('populate_ionisation_energies', '--input', path,
+                         stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_series(self):
+        self.assertEqual(IonisationEnergies.objects.count(), 6)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/ionisation-energies/?elements=Li,2,Be')
+        self.assertEqual(response.json(), {'He': [2372.3, 5250.5], 'Be': [],
+                                           'Li': [520.2, 7298.1, 11815.0]})
+        self.assertEqual(list(self.client.get('/api/ionisation-energies/').json()),
+                         ['H', 'He', 'Li'])
+
+        response = self.client.get('/api/ionisation-energies/?elements=Li&format=npz')
+        np.testing.assert_array_equal(np.load(io.BytesIO(response.content))['Li'],
+                                      [520.2, 7298.1, 11815.0])
+        response = self.client.get('/api/ionisation-energies/?elements=Xx')
+        self.assertEqual(response.status_code, 400)
+        # a digit int() cannot parse is an unknown element, not a crash
+        response = self.client.get('/api/ionisation-energies/?elements=%C2%B2')
+        self.assertEqual(response.json(), {'elements': ['Unknown element(s): ²']})
+
+
+class PeriodicTableTests(DatasetVersionMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        response_cache.clear()
+        elements = dict(ELEMENTS_JSON)
+        elements["3"] = {"symbol": "Li", "name": "Lithium", "period": "2",
+                         "group": "1", "atomic_weight": "6.94",
+                         "density": "0.534 g/cm³", "melting_point": "453.65 K"}
+        elements["58"] = {"symbol": "Ce", "name": "Cerium", "period": "6",
+                          "group": "", "atomic_weight": "140.116"}
+        call_command('populate_db', '--input', write_elements_json(self, elements),
+                     verbosity=0, stdout=io.StringIO(), stderr=io.StringIO())
+        for _ in range(2):  # re-running upserts
+            call_command('populate_tables', '--periods',
+                         os.path.join(settings.BASE_DIR, 'periods.json'),
+                         stdout=io.StringIO())
+
+    def test_tables(self):
+        self.assertEqual(Period.objects.count(), 7)
+        self.assertEqual(Period.objects.get(number=2).name, 'Period 2')
+        self.assertEqual(dict(Element.objects.values_list('symbol', 'block')),
+                         {'H': 's', 'He': 's', 'Li': 's', 'Ce': 'f'})
+        self.assertEqual(dict(Block.objects.values_list('name', 'groups')),
+                         {'s': [1, 2], 'f': []})
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/groups/')
+        self.assertEqual([(g['number'], g['elements']) for g in response.json()],
+                         [(1, ['H', 'Li']), (18, ['He'])])
+        response = self.client.get('/api/periods/1/?fields=name,elements')
+        self.assertEqual(response.json(), {'name': 'Period 1', 'elements': ['H', 'He']})
+        response = self.client.get('/api/blocks/f/')
+        self.assertEqual(response.json()['elements'], ['Ce'])
+
+    def test_stats(self):
+        response = self.client.get('/api/groups/stats/?properties=atomic_mass,'
+                                   'melting_point_kelvin')
+        group = response.json()['1']
+        self.assertEqual(group['atomic_mass']['count'], 2)
+        self.assertAlmostEqual(group['atomic_mass']['mean'], (1.008 + 6.94) / 2)
+        self.assertAlmostEqual(group['atomic_mass']['std'], (6.94 - 1.008) / 2)
+        self.assertEqual((group['melting_point_kelvin']['min'],
+                          group['melting_point_kelvin']['max']), (13.99, 453.65))
+        self.assertEqual(response.json()['18']['melting_point_kelvin'],
+                         {'count': 0, 'min': None, 'max': None, 'mean': None,
+                          'std': None})
+
+        blocks = self.client.get('/api/blocks/stats/').json()
+        self.assertEqual(sorted(blocks), ['f', 's'])
+        self.assertEqual(blocks['s']['atomic_mass']['count'], 3)
+        periods = self.client.get('/api/periods/stats/?properties=atomic_mass').json()
+        self.assertEqual(periods['6']['atomic_mass']['max'], 140.116)
+
+        Element.objects.filter(symbol='Li').update(atomic_mass=7.0)
+        dataset.bump_version()
+        response = self.client.get('/api/groups/stats/?properties=atomic_mass')
+        self.assertEqual(response.json()['1']['atomic_mass']['max'], 7.0)
+        response = self.client.get('/api/groups/stats/?properties=name')
+        self.assertEqual(response.status_code, 400)
+
+
+class ValueParsingTests(SimpleTestCase):
+
+    def test_parse_quantity(self):
+        cases = {
+            '1.00782503223 ± 0.00000000009': (1.00782503223, 9e-11, None),
+            '1.2-1.5 g/cm³': (1.35, 0.15, 'g/cm³'),
+            '[209]': (209.0, None, None),
+            '1.40×10^3 milligrams per kilogram': (1400.0, None, 'milligrams per kilogram'),
+            'Black phosphorus: 1.5, 2.5': (2.0, None, None),
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                quantity = values.parse_quantity(text)
+                for actual, wanted in zip(quantity, expected):
+                    if isinstance(wanted, float):
+                        self.assertAlmostEqual(actual, wanted)
+                    else:
+                        self.assertEqual(actual, wanted)
+        self.assertAlmostEqual(values.parse_quantity('1.00794(7)').uncertainty, 7e-5)
+        self.assertIsNone(values.parse_quantity('Stable'))
+        self.assertIsNone(values.parse_quantity('__import__("os")'))
+
+    def test_split_unit_normalises(self):
+        value, unit = values.split_unit('-259.16 °C (predicted)')
+        self.assertAlmostEqual(value, 13.99)
+        self.assertEqual(unit, 'K')
+        value, unit = values.split_unit('0.08988 g/L')
+        self.assertAlmostEqual(value, 8.988e-05)
+        self.assertEqual(unit, 'g/cm³')
+
+    def test_parse_quantities_column(self):
+        masses, uncertainties, units = values.parse_quantities(
+            ['1.5 ± 0.1 u', 'n/a', '1.5 ± 0.1 u', None])
+        self.assertEqual(masses[0], 1.5)
+        self.assertTrue(all(map(math.isnan, masses[[1, 3]])))
+        self.assertEqual(uncertainties[2], 0.1)
+        self.assertEqual(units, ['u', None, 'u', None])
+
+
+class PubChemStubHandler(http.server.BaseHTTPRequestHandler):
+    """Serve a minimal PubChem record for `/element/<n>`."""
+
+    def do_GET(self):
+        atomic_number = int(self.path.rsplit('/', 1)[-1])
+        symbol = {1: 'H', 2: 'He'}[atomic_number]
+        body = json.dumps({'Record': {'Section': [
+            {'TOCHeading': 'Element Symbol',
+             'Information': [{'Value': {'StringWithMarkup': [{'String': symbol}]}}]},
+        ]}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PubChemHarvestTests(SimpleTestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                                      PubChemStubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url_base = 'http://127.0.0.1:%d/element/{0}' % self.server.server_port
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(functools.partial(shutil.rmtree, self.cache_dir))
+        pub_chem.PubChemDataParser.DATA_CACHE.clear()
+        self.addCleanup(pub_chem.PubChemDataParser.DATA_CACHE.clear)
+
+    def harvest(self, **kwargs):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            return pub_chem.harvest([1, 2], concurrency=2,
+                                    cache_dir=self.cache_dir, **kwargs)
+
+    def test_harvest_then_reparse_offline(self):
+        elements, errors = self.harvest(url_base=self.url_base)
+        self.assertEqual(errors, {})
+        self.assertEqual({i: e['symbol'] for i, e in elements.items()},
+                         {1: 'H', 2: 'He'})
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        self.server.shutdown()
+        pub_chem.PubChemDataParser.DATA_CACHE.clear()
+        elements, errors = self.harvest(offline=True)
+        self.assertEqual(errors, {})
+        self.assertEqual(elements[2]['symbol'], 'He')
+
+    def test_corrupt_cache_entry_ignored(self):
+        cache = pub_chem.ResponseCache(self.cache_dir)
+        with open(cache.put(1, '{"Record": {}}'), 'w') as f:
+            f.write('tampered')
+        self.assertIsNone(cache.get(1))
+        elements, errors = self.harvest(offline=True)
+        self.assertEqual(set(errors), {1, 2})
+
+
+class ColumnExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Element.objects.create(atomic_number=1, name='Hydrogen', symbol='H',
+                               group=1, period=1, atomic_mass=1.008)
+        Element.objects.create(atomic_number=2, name='Helium', symbol='He',
+                               group=18, period=1)
+
+    def setUp(self):
+        response_cache.clear()
+
+    def test_json_columns(self):
+        response = self.client.get(
+            '/api/elements/columns/?fields=symbol,atomic_mass&period=1')
+        self.assertEqual(response.json(), {'symbol': ['H', 'He'],
+                                           'atomic_mass': [1.008, None]})
+        for fields in ('symbol,atomic_number', 'atomic_number,symbol'):
+            response = self.client.get(f'/api/elements/columns/?fields={fields}')
+            self.assertEqual(list(response.json()), ['atomic_number', 'symbol'])
+        self.assertIn('group', self.client.get('/api/elements/columns/').json())
+        response = self.client.get('/api/elements/columns/?fields=nonsense')
+        self.assertEqual(response.status_code, 400)
+
+    def test_npz_columns(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/elements/columns/?fields=atomic_number,atomic_mass&format=npz')
+        self.assertEqual(response['Content-Type'], 'application/x-npz')
+        with np.load(io.BytesIO(response.content)) as archive:
+            self.assertEqual(archive['atomic_number'].tolist(), [1, 2])
+            self.assertEqual(archive['atomic_mass__mask'].tolist(), [False, True])
+            self.assertTrue(np.isnan(archive['atomic_mass'][1]))
+
+
+class BatchLookupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Element.objects.create(atomic_number=1, name='Hydrogen', symbol='H',
+                               group=1, period=1)
+        Element.objects.create(atomic_number=8, name='Oxygen', symbol='O',
+                               group=16, period=2)
+        for isotope in ('1H', '2H', '16O'):
+            Isotope.objects.create(isotope=isotope)
+
+    def post(self, data):
+        return self.client.post('/api/batch/', data, content_type='application/json')
+
+    def test_heterogeneous_lookups(self):
+        lookups = [{'element': 'O'}, {'isotope': '2H'}, {'element': 1},
+                   {'isotope': '99Xx'}, {'element': '8'}] * 100
+        with self.assertNumQueries(2):
+            response = self.post({'lookups': lookups,
+                                  'fields': ['symbol', 'isotope']})
+        results = response.json()['results']
+        self.assertEqual(len(results), 500)
+        self.assertEqual(results[:5], [{'symbol': 'O'}, {'isotope': '2H'},
+                                       {'symbol': 'H'}, None, {'symbol': 'O'}])
+
+    def test_invalid_lookup(self):
+        response = self.post({'lookups': [{'element': 'H'}, {'molecule': 'H2O'}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.json()['lookups'])
+        response = self.post({'lookups': [{'element': True}, {'element': [1]}]})
+        self.assertEqual(set(response.json()['lookups']), {'0', '1'})
+        # not an atomic number int() can parse, so an unknown symbol
+        response = self.post({'lookups': [{'element': '²'}]})
+        self.assertEqual(response.json(), {'results': [None]})
+
+    def test_invalid_fields(self):
+        for fields in (5, [['x']], 'symbol'):
+            response = self.post({'lookups': [{'element': 'H'}], 'fields': fields})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('fields', response.json())
+
+
+class MolarMassTests(DatasetVersionMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for z, symbol, mass in ((1, 'H', 1.008), (6, 'C', 12.011), (8, 'O', 15.999),
+                                (16, 'S', 32.06), (29, 'Cu', 63.546)):
+            Element.objects.create(atomic_number=z, name=symbol, symbol=symbol,
+                                   group=1, period=1, atomic_mass=mass)
+        Isotope.objects.create(isotope='13C', atomic_mass=13.00335483507)
+
+    def test_parse_formula(self):
+        self.assertEqual(parse_formula('CuSO4·5H2O'),
+                         (('Cu', 1), ('H', 10), ('O', 9), ('S', 1)))
+        self.assertEqual(parse_formula('Cu(OH)2.3H2O'),
+                         (('Cu', 1), ('H', 8), ('O', 5)))
+        self.assertEqual(parse_formula('[13C]H3[Cu(CO)2]'),
+                         (('13C', 1), ('C', 2), ('Cu', 1), ('H', 3), ('O', 2)))
+        for formula in ('H2O)', '(H2O', 'Xx2', '2', ''):
+            with self.subTest(formula=formula):
+                self.assertRaises(FormulaError, parse_formula, formula)
+
+    def test_batch(self):
+        response = self.client.post(
+            '/api/molar-mass/',
+            {'formulas': ['H2O', 'CuSO4.5H2O', '[13C]O2', 'Zz', 'Fe']},
+            content_type='application/json')
+        water, hydrate, labelled, unknown, missing = response.json()['results']
+        self.assertAlmostEqual(water['molar_mass'], 18.015)
+        self.assertAlmostEqual(water['mass_fractions']['O'], 15.999 / 18.015)
+        self.assertAlmostEqual(hydrate['molar_mass'], 249.677)
+        self.assertAlmostEqual(labelled['molar_mass'], 13.00335483507 + 2 * 15.999)
+        self.assertIn('error', unknown)
+        self.assertIn('error', missing)
+
+    def test_get(self):
+        response = self.client.get('/api/molar-mass/?formulas=CO2,H2&fractions=false')
+        self.assertEqual(response.json()['results'],
+                         [{'formula': 'CO2', 'molar_mass': 12.011 + 2 * 15.999},
+                          {'formula': 'H2', 'molar_mass': 2.016}])
+
+
+class IsotopicPatternTests(DatasetVersionMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for isotope, mass, abundance in (('1H', 1.00782503223, 0.999885),
+                                         ('2H', 2.01410177812, 0.000115),
+                                         ('12C', 12.0, 0.9893),
+                                         ('13C', 13.00335483507, 0.0107),
+                                         ('14C', 14.0032419884, None)):
+            Isotope.objects.create(isotope=isotope, atomic_mass=mass,
+                                   abundance=abundance)
+
+    def test_methane(self):
+        response = self.client.get('/api/isotopic-pattern/?formula=CH4')
+        peaks = response.json()['results'][0]['peaks']
+        self.assertAlmostEqual(peaks[0]['mass'], 16.0313001)
+        self.assertEqual(peaks[0]['intensity'], 1.0)
+        # 13CH4 and CH3D are resolved at the default resolution
+        self.assertAlmostEqual(peaks[1]['mass'], 17.034655, places=6)
+        self.assertAlmostEqual(peaks[1]['intensity'], 0.0107 / 0.9893, places=6)
+        self.assertAlmostEqual(peaks[2]['intensity'], 4 * 0.000115 / 0.999885, places=6)
+
+        response = self.client.get('/api/isotopic-pattern/?formula=CH4&resolution=1')
+        peaks = response.json()['results'][0]['peaks']
+        self.assertAlmostEqual(peaks[1]['intensity'],
+                               0.0107 / 0.9893 + 4 * 0.000115 / 0.999885, places=4)
+
+    def test_labelled_and_large_molecules(self):
+        response = self.client.post(
+            '/api/isotopic-pattern/',
+            {'formulas': ['[14C]H4', 'C1000H2000', 'Fe'], 'threshold': 0.001},
+            content_type='application/json')
+        labelled, large, unknown = response.json()['results']
+        self.assertAlmostEqual(labelled['peaks'][0]['mass'], 18.0345420, places=5)
+        self.assertLess(len(large['peaks']), 100)
+        self.assertTrue(all(peak['intensity'] >= 0.001 for peak in large['peaks']))
+        self.assertIn('error', unknown)
+
+    def test_invalid_parameters(self):
+        response = self.client.get('/api/isotopic-pattern/?formula=CH4&threshold=2')
+        self.assertEqual(response.status_code, 400)
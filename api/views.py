@@ -1,40 +1,719 @@
+import math
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 
 # Create your views here.
+from django.db import models
+from django.db.models import F, Prefetch, Q
+from django.db.models.functions import Abs
 from rest_framework import viewsets
-from django_filters import CharFilter
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.response import Response
+from rest_framework.views import APIView
 import django_filters.rest_framework as filters
+from django_filters.utils import translate_validation
+
+from api import dataset, metrics, search
+from api.cache import lookup_response, normalise_query, response_cache
+from api.chemistry import FormulaError, get_mass_table
+from api.diffraction import (
+    DEFAULT_WAVELENGTH, ReflectionLimitError, pattern_cache, powder_pattern
+)
+from api.models import (
+    ATOMIC_NUMBERS, INDEXED_PROPERTIES, SYMBOLS, Block, CrystalStructure,
+    Element, Group, IonisationEnergies, Isotope, Period
+)
+from api.pagination import KeysetPagination
+from api.renderers import NDJSONRenderer, NpzRenderer
+from api.serializers import (
+    BlockSerializer, CrystalStructureSerializer, ElementSerializer,
+    GroupSerializer, IsotopeSerializer, PeriodSerializer
+)
+from api.snapshot import filter_lookups, get_snapshot, model_fields
+from api.stats import NUMERIC_PROPERTIES, get_property_stats
+
+
+class FilterBackend(filters.DjangoFilterBackend):
+    """DjangoFilterBackend timed as the `filter` phase of the request."""
+
+    def filter_queryset(self, request, queryset, view):
+        with metrics.timed('filter'):
+            return super().filter_queryset(request, queryset, view)
+
+
+class ProjectionMixin:
+    """
+    Push the `fields` query parameter down into SQL with `.only()` and use a
+    serializer class compiled for that projection.
+    """
+
+    def get_requested_fields(self):
+        fields = self.request.query_params.get('fields')
+        return set(fields.split(',')) if fields else None
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        fields = self.get_requested_fields()
+        if fields is None:
+            return serializer_class
+        return serializer_class.for_fields(fields)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields is None or self.request.method not in ('GET', 'HEAD'):
+            return queryset
+        model = queryset.model
+        columns = {field.name for field in model._meta.concrete_fields}
+        return queryset.only(model._meta.pk.name,
+                             *(columns & set(self.get_serializer_class().Meta.fields)))
+
+
+class SnapshotMixin:
+    """
+    Answer list and retrieve requests from the in-memory snapshot when
+    `settings.API_SNAPSHOT` is enabled, falling back to the ORM otherwise.
+    """
+
+    def get_snapshot_lookups(self, request):
+        """
+        Validate the query with the viewset's FilterSet, as the ORM path
+        does, and return the cleaned values keyed by ``(field, lookup)``.
+        """
+        filterset_class = filters.DjangoFilterBackend().get_filterset_class(
+            self, self.queryset)
+        filterset = filterset_class(request.query_params, request=request)
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return filter_lookups(filterset)
+
+    def use_snapshot(self, request):
+        """Whether `request` can be answered from the snapshot."""
+        paginator = self.paginator
+        return settings.API_SNAPSHOT and not (
+            paginator is not None and paginator.is_requested(request))
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_snapshot(request):
+            return super().list(request, *args, **kwargs)
+        table = get_snapshot().table(self.queryset.model)
+        with metrics.timed('filter'):
+            rows = table.filter(self.get_snapshot_lookups(request))
+        with metrics.timed('serialize'):
+            return Response(table.records(rows, self.get_requested_fields()))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_snapshot(request):
+            return super().retrieve(request, *args, **kwargs)
+        model = self.queryset.model
+        table = get_snapshot().table(model)
+        try:
+            pk = model._meta.pk.to_python(kwargs[self.lookup_field])
+        except DjangoValidationError:
+            pk = None
+        row = table.get(pk)
+        if row is None:
+            raise Http404(f"No {model._meta.object_name} matches the given query.")
+        return Response(table.records([row], self.get_requested_fields())[0])
+
+
+class ExpandMixin:
+    """
+    Embed the related objects named in `?expand=` (see the serializer's
+    `expandable_fields`), fetching each relation with one prefetch query
+    whatever the number of rows. Expanded requests bypass the snapshot.
+    """
+    expand_prefetches = {}
+
+    def get_expansions(self):
+        expand = self.request.query_params.get('expand')
+        if not expand:
+            return ()
+        names = sorted(set(filter(None, expand.split(','))))
+        expandable = self.serializer_class.expandable_fields
+        unknown = [name for name in names if name not in expandable]
+        if unknown:
+            raise ValidationError({'expand': [
+                f"Unknown relation(s): {', '.join(unknown)}; "
+                f"expected {', '.join(expandable)}"]})
+        return names
+
+    def use_snapshot(self, request):
+        return super().use_snapshot(request) and not self.get_expansions()
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        expansions = self.get_expansions()
+        return serializer_class.expanded(expansions) if expansions else serializer_class
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return queryset.prefetch_related(*(
+            self.expand_prefetches.get(name, name) for name in self.get_expansions()))
+
+
+class StreamingMixin:
+    """
+    Stream list responses rendered as NDJSON, reading the filtered queryset
+    with `.iterator()` and encoding records as they arrive, so memory use
+    stays flat however large the result is. These are never paginated.
+    """
+    iterator_chunk_size = 2000
+
+    def list(self, request, *args, **kwargs):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if not isinstance(renderer, NDJSONRenderer):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = model_fields(self.get_serializer_class())
+        records = queryset.order_by('pk').values(*columns).iterator(
+            chunk_size=self.iterator_chunk_size)
+        return StreamingHttpResponse(
+            renderer.stream(records),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}')
+
 
-from api.models import Element, Isotope
-from api.serializers import ElementSerializer, IsotopeSerializer
+class CachedResponseMixin:
+    """
+    Add ETag/Last-Modified headers derived from the dataset version to list
+    and retrieve responses, answer matching conditional requests with 304 and
+    keep rendered bodies in an LRU cache keyed on the normalised query.
+    Writes bump the dataset version, so they invalidate these responses and
+    every other cache keyed on it.
+    """
+    _response_cache_key = None
+
+    def get_response_cache_key(self, request):
+        """Key identifying the representation, or None if not cacheable."""
+        renderer = getattr(request, 'accepted_renderer', None)
+        if renderer is None or renderer.format == 'api':
+            return None  # the browsable API is rendered per user
+        return (request.path, normalise_query(request.query_params),
+                request.accepted_media_type)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+
+        response, key, headers = lookup_response(request, key)
+        if response is None:
+            self._response_cache_key = key
+            response = handler(request, *args, **kwargs)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self._response_cache_key is not None and response.status_code == 200:
+            response.render()
+            response_cache.set(self._response_cache_key,
+                               (response.content, response['Content-Type']))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def dataset_changed(self):
+        """Called after every write through this viewset."""
+        dataset.bump_version()
 
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.dataset_changed()
 
-class ElementViewSet(viewsets.ModelViewSet):
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.dataset_changed()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.dataset_changed()
+
+
+class ElementViewSet(CachedResponseMixin, ExpandMixin, SnapshotMixin,
+                     ProjectionMixin, viewsets.ModelViewSet):
     """
-    API endpoint that allows Elements to be viewed or edited.
+    API endpoint that allows Elements to be viewed or edited, optionally
+    with `?expand=isotopes,oxidation_states` embedded.
     """
     queryset = Element.objects.all()
     serializer_class = ElementSerializer
-    filter_backends = [filters.DjangoFilterBackend]
-    filterset_fields = ('name', 'symbol', 'atomic_number', 'period', 'group')
+    expand_prefetches = {
+        'isotopes': Prefetch('isotopes',
+                             queryset=Isotope.objects.order_by('mass_number', 'isotope')),
+    }
+    filter_backends = [FilterBackend]
+    filterset_fields = {
+        'name': ['exact'],
+        'symbol': ['exact', 'in'],
+        'atomic_number': ['exact', 'in'],
+        'period': ['exact'],
+        'group': ['exact'],
+        **{name: ['exact', 'gte', 'lte', 'range'] for name in INDEXED_PROPERTIES},
+    }
+
+    def dataset_changed(self):
+        super().dataset_changed()
+        search.rebuild_index()
+
+    @action(detail=False)
+    def nearest(self, request):
+        """
+        Elements whose property is closest to a value, closest first, e.g.
+        `/api/elements/nearest/?property=pauling_scale_electronegativity&value=2.5&k=5`.
+        Answered by binary search over the snapshot's presorted columns, or
+        with one query ordered by distance when the snapshot is disabled.
+        """
+        return self.get_cached_response(self.get_nearest_response, request)
+
+    def get_nearest_response(self, request):
+        params = request.query_params
+        name = params.get('property')
+        if name not in INDEXED_PROPERTIES:
+            raise ValidationError({'property': [
+                f"Expected one of: {', '.join(INDEXED_PROPERTIES)}"]})
+        try:
+            value = float(params['value'])
+        except (KeyError, ValueError):
+            value = math.nan
+        if not math.isfinite(value):
+            raise ValidationError({'value': ['A finite number is required.']})
+        try:
+            k = int(params.get('k', 5))
+        except ValueError:
+            k = 0
+        if not 0 < k <= len(SYMBOLS):
+            raise ValidationError({'k': [
+                f'Expected an integer between 1 and {len(SYMBOLS)}.']})
 
+        if settings.API_SNAPSHOT:
+            table = get_snapshot().table(Element)
+            rows = table.nearest(name, value, k)
+            return Response(table.records(rows, self.get_requested_fields()))
 
-class IsotopeViewSet(viewsets.ModelViewSet):
+        # ties go to the smaller value, as in the snapshot's binary search
+        queryset = Element.objects.filter(**{f'{name}__isnull': False}) \
+            .order_by(Abs(F(name) - value), name, 'pk')[:k]
+        return Response(list(queryset.values(*model_fields(self.get_serializer_class()))))
+
+    @action(detail=False, renderer_classes=[JSONRenderer, NpzRenderer])
+    def columns(self, request):
+        """
+        Column-oriented export of element properties, e.g.
+        `/api/elements/columns/?fields=atomic_mass,density_g_per_cm3`, as
+        JSON or as a NumPy archive with null masks using `?format=npz`.
+        Defaults to every numeric property. Columns are always in model
+        field order, whatever the order of `fields`.
+        """
+        return self.get_cached_response(self.get_columns_response, request)
+
+    def get_columns_response(self, request):
+        concrete_fields = {f.attname: f for f in Element._meta.concrete_fields}
+        fields = request.query_params.get('fields')
+        if fields:
+            requested = set(filter(None, fields.split(',')))
+            unknown = sorted(requested - concrete_fields.keys())
+            if unknown:
+                raise ValidationError(
+                    {'fields': [f"Unknown field(s): {', '.join(unknown)}"]})
+            # canonical, as the response cache key sorts `fields`
+            names = [name for name in concrete_fields if name in requested]
+        else:
+            names = [name for name, field in concrete_fields.items()
+                     if isinstance(field, (models.FloatField, models.IntegerField))]
+
+        rows = self.filter_queryset(Element.objects.all()) \
+            .order_by('atomic_number').values_list(*names)
+        columns = list(zip(*rows)) or [()] * len(names)
+        return Response({name: list(column) for name, column in zip(names, columns)})
+
+
+class IsotopeViewSet(StreamingMixin, CachedResponseMixin, SnapshotMixin,
+                     ProjectionMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows Isotopes to be viewed or edited.
     """
-
-    @staticmethod
-    def get_element(query, value):
-        return query.extra(where=['element = %s'], params=[value])
-
     queryset = Isotope.objects.all()
     serializer_class = IsotopeSerializer
-    filter_backends = [filters.DjangoFilterBackend]
-    filterset_fields = ('isotope', 'halflife', 'year_discovered')
-    filter_fields = {
-        'isotope': ['exact'],
+    pagination_class = KeysetPagination
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    filter_backends = [FilterBackend]
+    filterset_fields = {
+        'isotope': ['exact', 'in'],
+        'element': ['exact', 'in'],
+        'mass_number': ['exact', 'gte', 'lte'],
+        'neutrons': ['exact', 'gte', 'lte'],
         'halflife': ['exact'],
         'year_discovered': ['gte', 'lte', 'exact']
     }
-    element = CharFilter(action=get_element)
+
+
+class StructureViewSet(CachedResponseMixin, ProjectionMixin, viewsets.ModelViewSet):
+    """
+    API endpoint that allows crystal structures to be viewed or edited, with
+    precomputed unit-cell volume, lattice and reciprocal vectors.
+    """
+    queryset = CrystalStructure.objects.order_by('name')
+    serializer_class = CrystalStructureSerializer
+    lookup_field = 'name'
+    filter_backends = [FilterBackend]
+    filterset_fields = {
+        'name': ['exact', 'in'],
+        'chemical_formula': ['exact'],
+        'lattice_system': ['exact'],
+        'symmetry': ['exact'],
+        'space_group_number': ['exact'],
+        'volume': ['gte', 'lte'],
+    }
+
+    @action(detail=True)
+    def diffraction(self, request, name=None):
+        """
+        Powder diffraction peaks (2θ, d-spacing, relative intensity, hkl and
+        multiplicity), e.g. `/api/structures/Fe/diffraction/?wavelength=1.5406&max_two_theta=90`.
+        The wavelength (Å) defaults to Cu Kα1 and `max_two_theta` (degrees)
+        to 180. Patterns are memoized per structure, wavelength and cutoff.
+        """
+        return self.get_cached_response(self.get_diffraction_response, request,
+                                        name=name)
+
+    @staticmethod
+    def get_float(params, name, default, upper):
+        try:
+            value = float(params.get(name, default))
+        except ValueError:
+            value = -1
+        if not 0 < value <= upper:
+            raise ValidationError({name: [f'Expected a number in (0, {upper}].']})
+        return value
+
+    def get_diffraction_response(self, request, name=None):
+        params = request.query_params
+        wavelength = self.get_float(params, 'wavelength', DEFAULT_WAVELENGTH, 10)
+        max_two_theta = self.get_float(params, 'max_two_theta', 180, 180)
+
+        version = dataset.version()
+        pattern_cache.sync(version)
+        key = (name, wavelength, max_two_theta)
+        peaks = pattern_cache.get(key)
+        if peaks is None:
+            structure = self.get_object()
+            try:
+                peaks = powder_pattern(structure.reciprocal_vectors, structure.atoms,
+                                       wavelength, max_two_theta,
+                                       settings.API_MAX_REFLECTIONS)
+            except ReflectionLimitError as err:
+                raise ValidationError({'wavelength': [str(err)]})
+            pattern_cache.set(key, peaks)
+        return Response({'name': name, 'wavelength': wavelength,
+                         'max_two_theta': max_two_theta, 'peaks': peaks})
+
+
+class MembersMixin:
+    """
+    Resolve the member elements of every row with one query over the
+    Element table, matched on `member_field`, and add a `stats` action
+    aggregating their numeric properties.
+    """
+    member_field = None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        members = {}
+        rows = Element.objects.order_by('atomic_number') \
+            .values_list(self.member_field, 'symbol')
+        for key, symbol in rows:
+            members.setdefault(key, []).append(symbol)
+        context['members'] = members
+        return context
+
+    @action(detail=False)
+    def stats(self, request):
+        """
+        Count, min, max, mean and (population) std of numeric element
+        properties for the members of each row, e.g.
+        `/api/groups/stats/?properties=atomic_mass,density_g_per_cm3`.
+        Defaults to every numeric property; cached per dataset version.
+        """
+        return self.get_cached_response(self.get_stats_response, request)
+
+    def get_stats_response(self, request):
+        properties = request.query_params.get('properties')
+        if properties:
+            names = tuple(dict.fromkeys(filter(None, properties.split(','))))
+            unknown = [name for name in names if name not in NUMERIC_PROPERTIES]
+            if unknown:
+                raise ValidationError({'properties': [
+                    f"Unknown or non-numeric field(s): {', '.join(unknown)}"]})
+        else:
+            names = NUMERIC_PROPERTIES
+        return Response(get_property_stats().aggregate(self.member_field, names))
+
+
+class GroupViewSet(MembersMixin, CachedResponseMixin, ProjectionMixin,
+                   viewsets.ModelViewSet):
+    """
+    API endpoint that allows Groups to be viewed or edited, listing the
+    symbols of their elements.
+    """
+    queryset = Group.objects.order_by('number')
+    serializer_class = GroupSerializer
+    member_field = 'group'
+
+
+class PeriodViewSet(MembersMixin, CachedResponseMixin, ProjectionMixin,
+                    viewsets.ModelViewSet):
+    """
+    API endpoint that allows Periods to be viewed or edited, listing the
+    symbols of their elements.
+    """
+    queryset = Period.objects.order_by('number')
+    serializer_class = PeriodSerializer
+    member_field = 'period'
+
+
+class BlockViewSet(MembersMixin, CachedResponseMixin, ProjectionMixin,
+                   viewsets.ModelViewSet):
+    """
+    API endpoint that allows Blocks to be viewed or edited, listing the
+    symbols of their elements.
+    """
+    queryset = Block.objects.order_by('name')
+    serializer_class = BlockSerializer
+    lookup_field = 'name'
+    member_field = 'block'
+
+
+class BatchLookupView(APIView):
+    """
+    API endpoint that resolves many element and isotope lookups at once.
+
+    POST ``{"lookups": [{"element": "Fe"}, {"element": 8}, {"isotope": "56Fe"}],
+    "fields": ["symbol", "isotope", "atomic_mass"]}``; elements may be given
+    by symbol or atomic number and `fields` is optional. Results are returned
+    in request order (null if not found) using one query per model.
+    """
+
+    def post(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        lookups = data.get('lookups')
+        if not isinstance(lookups, list):
+            raise ValidationError({'lookups': ['Expected a list of lookups.']})
+        if len(lookups) > settings.API_BATCH_MAX_LOOKUPS:
+            raise ValidationError({'lookups': [
+                f'At most {settings.API_BATCH_MAX_LOOKUPS} lookups are allowed.']})
+        fields = data.get('fields')
+        if fields is not None and (not isinstance(fields, list) or
+                                   not all(isinstance(f, str) for f in fields)):
+            raise ValidationError({'fields': ['Expected a list of field names.']})
+
+        keys, errors = [], {}
+        for i, lookup in enumerate(lookups):
+            value = next(iter(lookup.values()), None) if isinstance(lookup, dict) else None
+            # bool is an int subclass, so True would otherwise mean hydrogen
+            if (not isinstance(lookup, dict) or len(lookup) != 1
+                    or not set(lookup) <= {'element', 'isotope'}
+                    or isinstance(value, bool) or not isinstance(value, (str, int))):
+                errors[i] = ['Expected {"element": <symbol or number>} '
+                             'or {"isotope": <nuclide>}.']
+                continue
+            (kind, value), = lookup.items()
+            if kind == 'element' and str(value).isascii() and str(value).isdecimal():
+                value = int(value)
+            keys.append((kind, value if isinstance(value, int) else str(value)))
+        if errors:
+            raise ValidationError({'lookups': errors})
+
+        symbols = {v for k, v in keys if k == 'element' and isinstance(v, str)}
+        numbers = {v for k, v in keys if k == 'element' and isinstance(v, int)}
+        nuclides = {v for k, v in keys if k == 'isotope'}
+
+        elements = []
+        if symbols or numbers:
+            elements = Element.objects.filter(
+                Q(symbol__in=symbols) | Q(atomic_number__in=numbers))
+        isotopes = Isotope.objects.in_bulk(nuclides) if nuclides else {}
+
+        resolved = {}
+        for kind, serializer_class, objects in (
+                ('element', ElementSerializer, list(elements)),
+                ('isotope', IsotopeSerializer, list(isotopes.values()))):
+            if fields:
+                serializer_class = serializer_class.for_fields(fields)
+            rows = serializer_class(objects, many=True,
+                                    context={'request': request}).data
+            for obj, row in zip(objects, rows):
+                resolved[kind, obj.pk] = row
+                if kind == 'element':
+                    resolved[kind, obj.symbol] = row
+
+        return Response({'results': [resolved.get(key) for key in keys]})
+
+
+class MolarMassView(APIView):
+    """
+    API endpoint that computes molar masses and mass fractions for a batch
+    of chemical formulas.
+
+    POST ``{"formulas": ["H2O", "CuSO4·5H2O", "[13C]O2"], "fractions": true}``
+    or GET ``?formulas=H2O,NaCl``.
+    """
+
+    def get(self, request):
+        formulas = request.query_params.get('formulas', '')
+        fractions = request.query_params.get('fractions', 'true') != 'false'
+        return self.calculate([f for f in formulas.split(',') if f], fractions)
+
+    def post(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        formulas = data.get('formulas')
+        if not isinstance(formulas, list) or not all(isinstance(f, str) for f in formulas):
+            raise ValidationError({'formulas': ['Expected a list of formulas.']})
+        return self.calculate(formulas, bool(data.get('fractions', True)))
+
+    def calculate(self, formulas, fractions):
+        if len(formulas) > settings.API_MAX_FORMULAS:
+            raise ValidationError({'formulas': [
+                f'At most {settings.API_MAX_FORMULAS} formulas are allowed.']})
+        results = get_mass_table().molar_masses(formulas, fractions=fractions)
+        return Response({'results': results})
+
+
+class IsotopicPatternView(APIView):
+    """
+    API endpoint that computes theoretical isotopic patterns (peak masses and
+    relative intensities) from the isotope abundance data.
+
+    GET ``?formula=C6H12O6`` or POST ``{"formulas": [...]}``; `threshold`
+    (relative intensity below which peaks are pruned) and `resolution` (width
+    in Da of the bins peaks are merged into) are optional.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        formulas = [params['formula']] if params.get('formula') else []
+        return self.calculate(formulas, params.get('threshold'),
+                              params.get('resolution'))
+
+    def post(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        formulas = data.get('formulas')
+        if not isinstance(formulas, list) or not all(isinstance(f, str) for f in formulas):
+            raise ValidationError({'formulas': ['Expected a list of formulas.']})
+        return self.calculate(formulas, data.get('threshold'),
+                              data.get('resolution'))
+
+    @staticmethod
+    def get_parameter(name, value, default):
+        if value in (None, ''):
+            return default
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = -1
+        if not 0 < value <= 1:
+            raise ValidationError({name: ['Expected a number in (0, 1].']})
+        return value
+
+    def calculate(self, formulas, threshold, resolution):
+        if not formulas:
+            raise ValidationError({'formula': ['A formula is required.']})
+        if len(formulas) > settings.API_MAX_FORMULAS:
+            raise ValidationError({'formulas': [
+                f'At most {settings.API_MAX_FORMULAS} formulas are allowed.']})
+        threshold = self.get_parameter('threshold', threshold, 1e-6)
+        resolution = self.get_parameter('resolution', resolution, 1e-3)
+
+        table = get_mass_table()
+        results = []
+        for formula in formulas:
+            try:
+                peaks = table.isotopic_pattern(formula, threshold, resolution)
+                results.append({'formula': formula, 'peaks': peaks})
+            except FormulaError as err:
+                results.append({'formula': formula, 'error': str(err)})
+        return Response({'results': results})
+
+
+class IonisationEnergiesView(CachedResponseMixin, APIView):
+    """
+    API endpoint returning successive ionisation energies (kJ/mol) as one
+    array per element, indexed by ionisation number - 1 (null where missing).
+
+    GET ``?elements=Fe,O,26`` (symbols or atomic numbers, default all), as
+    JSON or as a NumPy archive with ``?format=npz``. Answered in one query.
+    """
+    renderer_classes = [JSONRenderer, NpzRenderer]
+
+    def get(self, request):
+        return self.get_cached_response(self.get_series_response, request)
+
+    def get_series_response(self, request):
+        queryset = IonisationEnergies.objects.order_by('element', 'ionisation_number')
+        series = {}
+        requested = request.query_params.get('elements')
+        if requested:
+            numbers, unknown = [], []
+            for key in filter(None, requested.split(',')):
+                number = int(key) if key.isascii() and key.isdecimal() \
+                    else ATOMIC_NUMBERS.get(key)
+                if number is None or not 0 < number <= len(SYMBOLS):
+                    unknown.append(key)
+                else:
+                    numbers.append(number)
+            if unknown:
+                raise ValidationError(
+                    {'elements': [f"Unknown element(s): {', '.join(unknown)}"]})
+            series = {SYMBOLS[number - 1]: [] for number in sorted(set(numbers))}
+            queryset = queryset.filter(element__in=numbers)
+
+        rows = queryset.values_list('element', 'ionisation_number', 'energy')
+        for number, ionisation_number, energy in rows:
+            energies = series.setdefault(SYMBOLS[number - 1], [])
+            energies.extend([None] * (ionisation_number - 1 - len(energies)))
+            energies.append(energy)
+        return Response(series)
+
+
+class SearchView(CachedResponseMixin, APIView):
+    """
+    API endpoint for full-text search over element names, symbols,
+    discoverers, appearances, descriptions, uses and sources.
+
+    GET ``?q=magnetic met`` returns the elements containing every word (the
+    last one as a prefix), best match first, each with a highlighted snippet.
+    ``?limit=`` caps the number of results (default 20).
+    """
+    max_limit = 118
+
+    def get(self, request):
+        return self.get_cached_response(self.get_search_response, request)
+
+    def get_search_response(self, request):
+        query = request.query_params.get('q', '')
+        if search.match_expression(query) is None:
+            raise ValidationError({'q': ['A search query is required.']})
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            limit = -1
+        if not 0 < limit <= self.max_limit:
+            raise ValidationError({'limit': [
+                f'Expected an integer between 1 and {self.max_limit}.']})
+        return Response({'results': search.search(query, limit)})
+
+
+def metrics_view(request):
+    """Per-route request phase histograms in the Prometheus text format."""
+    return HttpResponse(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
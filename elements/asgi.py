@@ -0,0 +1,37 @@
+"""
+ASGI config for elements project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are routed through `elements.asgi_urls`, which serves element and
+isotope reads from async views before falling back to `elements.urls`.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+
+import django
+from django.core.handlers.asgi import ASGIHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elements.settings')
+
+
+class AsyncRoutesHandler(ASGIHandler):
+    urlconf = 'elements.asgi_urls'
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = self.urlconf
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+application = AsyncRoutesHandler()
+
+from django.conf import settings  # noqa: E402
+
+if settings.API_SNAPSHOT:
+    from api.snapshot import get_snapshot
+    get_snapshot()  # load the dataset once at process start
@@ -0,0 +1,13 @@
+"""URLs served under ASGI: the async read paths, then everything in `elements.urls`."""
+from django.urls import include, path, re_path
+
+from api import async_views
+
+
+urlpatterns = [
+    path('api/elements/', async_views.ElementReadView.as_view()),
+    re_path(r'^api/elements/(?P<pk>[0-9]+)/$', async_views.ElementReadView.as_view()),
+    path('api/isotopes/', async_views.IsotopeReadView.as_view()),
+    re_path(r'^api/isotopes/(?P<pk>[^/.]+)/$', async_views.IsotopeReadView.as_view()),
+    path('', include('elements.urls')),
+]
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,6 +90,55 @@ DATABASES = {
     }
 }
 
+# Serve from a prebuilt, read-only database file (see `build_artifact`)
+DATABASE_ARTIFACT = os.environ.get('DATABASE_ARTIFACT', '')
+
+# Bytes of the database memory-mapped, and KiB of page cache, per connection
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', 64 * 1024))
+
+if DATABASE_ARTIFACT:
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        # immutable: no locking or change detection, the file never changes
+        'NAME': f'file:{DATABASE_ARTIFACT}?mode=ro&immutable=1',
+        'CONN_MAX_AGE': None,
+        'OPTIONS': {
+            'init_command': f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}; '
+                            f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE}; '
+                            'PRAGMA query_only=1',
+        },
+    }
+
+# Marker file touched by `populate_db` whenever the dataset changes
+DATASET_VERSION_FILE = os.environ.get(
+    'DATASET_VERSION_FILE', os.path.join(BASE_DIR, 'db.sqlite3.version'))
+
+# Serve read-only element/isotope requests from an in-memory snapshot
+API_SNAPSHOT = os.environ.get('API_SNAPSHOT', '').lower() in ('1', 'true', 'yes')
+
+# Number of rendered list/retrieve responses kept per process
+API_RESPONSE_CACHE_SIZE = int(os.environ.get('API_RESPONSE_CACHE_SIZE', 512))
+
+# Maximum number of lookups accepted by a single /api/batch/ request
+API_BATCH_MAX_LOOKUPS = int(os.environ.get('API_BATCH_MAX_LOOKUPS', 10000))
+
+# Maximum number of formulas accepted by a single /api/molar-mass/ request
+API_MAX_FORMULAS = int(os.environ.get('API_MAX_FORMULAS', 500000))
+
+# Number of computed powder diffraction patterns kept per process
+API_DIFFRACTION_CACHE_SIZE = int(os.environ.get('API_DIFFRACTION_CACHE_SIZE', 4096))
+
+# Maximum number of (hkl) candidates generated for one diffraction pattern
+API_MAX_REFLECTIONS = int(os.environ.get('API_MAX_REFLECTIONS', 1000000))
+
+# Maximum number of route/method/parameter label sets kept by /metrics
+API_METRICS_MAX_SERIES = int(os.environ.get('API_METRICS_MAX_SERIES', 1000))
+
+# Allow large batch request bodies
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('DATA_UPLOAD_MAX_MEMORY_SIZE',
+                                                 32 * 1024 * 1024))
+
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
 }
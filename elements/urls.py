@@ -22,10 +22,22 @@ from api import views
 router = routers.DefaultRouter()
 router.register(r'elements', views.ElementViewSet)
 router.register(r'isotopes', views.IsotopeViewSet)
+router.register(r'structures', views.StructureViewSet)
+router.register(r'groups', views.GroupViewSet)
+router.register(r'periods', views.PeriodViewSet)
+router.register(r'blocks', views.BlockViewSet)
 
 # Wire up our API using automatic URL routing.
 # Additionally, we include login URLs for the browsable API.
 urlpatterns = [
+    path('api/batch/', views.BatchLookupView.as_view(), name='batch'),
+    path('api/molar-mass/', views.MolarMassView.as_view(), name='molar-mass'),
+    path('api/isotopic-pattern/', views.IsotopicPatternView.as_view(),
+         name='isotopic-pattern'),
+    path('api/ionisation-energies/', views.IonisationEnergiesView.as_view(),
+         name='ionisation-energies'),
+    path('api/search/', views.SearchView.as_view(), name='search'),
     path('api/', include(router.urls)),
+    path('metrics', views.metrics_view, name='metrics'),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework'))
 ]
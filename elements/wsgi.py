@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elements.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.API_SNAPSHOT:
+    from api.snapshot import get_snapshot
+    get_snapshot()  # load the dataset once at process start
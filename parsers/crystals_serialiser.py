@@ -2,84 +2,234 @@
 import crystals
 import re
 import json
+import sys
+import time
 import types
 import numpy as np
+import spglib
 
+from concurrent.futures import ProcessPoolExecutor
+from crystals.spg_data import Hall2HM
 from tqdm import tqdm
 
 
+def symmetry(crystal, symprec=1e-2):
+    """Space-group information of `crystal` as returned by `Crystal.symmetry`.
+
+    spglib >= 2.5 reports success with an empty error message, which older
+    crystals releases mistake for a failure; in that case the dataset is
+    read from spglib directly. Returns None if no space group is found.
+    """
+    try:
+        return crystal.symmetry(symprec=symprec)
+    except RuntimeError:
+        pass
+    cell = (np.array(crystal.lattice_vectors),
+            np.array([atom.coords_fractional for atom in crystal]),
+            [atom.atomic_number for atom in crystal])
+    dataset = spglib.get_symmetry_dataset(cell, symprec=symprec)
+    if dataset is None or dataset.hall not in Hall2HM:
+        return None
+    hm_symbol = Hall2HM[dataset.hall]
+    return {'international_symbol': dataset.international,
+            'hall_symbol': dataset.hall,
+            'hm_symbol': hm_symbol,
+            'centering': crystals.CenteringType(
+                hm_symbol[0] if hm_symbol[0] not in 'AB' else 'C'),
+            'international_number': dataset.number,
+            'hall_number': dataset.hall_number,
+            'international_full': spglib.get_spacegroup_type(
+                dataset.hall_number).international_full,
+            'pointgroup': dataset.pointgroup}
+
+
 class CrystalSerialiser:
-    """Class for serialising crystals.Crystal objects."""
+    """Class for serialising crystals.Crystal objects.
+
+    The attributes to read from each type, and how to convert each value, are
+    worked out once per type (`plan`, `converter`) so that every object is
+    serialised in a single pass without repeated reflection.
+    """
 
     DEFAULT_EXCLUDES = ('builtins', 'reciprocal', 'reciprocal_vectors',
                         'valid_names', 'valid_symbols')
+    # Crystal properties that each recompute `symmetry()`; read from one call
+    SYMMETRY_ATTRIBUTES = ('centering', 'hall_number', 'hall_symbol',
+                           'hm_symbol', 'international_full',
+                           'international_number', 'international_symbol',
+                           'pointgroup')
+    LATTICE_PARAMETERS = ('a', 'b', 'c', 'α', 'β', 'γ')
+
+    _plans = {}
+    _converters = {}
 
     @staticmethod
     def get_attributes(obj, specific_excludes=DEFAULT_EXCLUDES):
         """Retrieve desired attributes from obj, excluding problematic ones."""
-        return {attr: getattr(obj, attr) for attr in dir(obj)
-                if not attr.startswith('_')
-                and not callable(getattr(obj, attr))
-                and attr not in specific_excludes}
+        attributes = {}
+        for attr in dir(obj):
+            if attr.startswith('_') or attr in specific_excludes:
+                continue
+            value = getattr(obj, attr)
+            if not callable(value):
+                attributes[attr] = value
+        return attributes
+
+    @classmethod
+    def plan(cls, obj):
+        """``(attribute, converter)`` pairs to read from objects like `obj`."""
+        kind = type(obj)
+        plan = cls._plans.get(kind)
+        if plan is not None:
+            return plan
+        excludes = cls.DEFAULT_EXCLUDES
+        if isinstance(obj, crystals.Crystal):
+            excludes += cls.SYMMETRY_ATTRIBUTES
+        attrs = list(cls.get_attributes(obj, excludes))
+        if 'element_full' in attrs and 'element' in attrs:
+            attrs.remove('element_full')
+            attrs.remove('element')
+        named = {'lattice_system': cls.enum_name,
+                 'lattice_parameters': cls.lattice_parameters,
+                 'source': cls.source}
+        plan = cls._plans[kind] = tuple((attr, named.get(attr)) for attr in attrs)
+        return plan
+
+    @classmethod
+    def converter(cls, kind):
+        """Function converting values of type `kind` to JSON compatible types."""
+        convert = cls._converters.get(kind)
+        if convert is None:
+            if issubclass(kind, np.ndarray):
+                convert = np.ndarray.tolist
+            elif issubclass(kind, crystals.CenteringType):
+                convert = cls.enum_name
+            elif issubclass(kind, crystals.ElectronicStructure):
+                convert = str
+            elif issubclass(kind, crystals.Lattice):
+                convert = cls.serialise
+            elif issubclass(kind, (types.GeneratorType, frozenset)):
+                convert = cls.serialise_all
+            elif issubclass(kind, (tuple, list)):
+                convert = cls.serialise_sequence
+            elif issubclass(kind, dict):
+                convert = cls.serialise_mapping
+            else:
+                convert = cls.identity
+            cls._converters[kind] = convert
+        return convert
+
+    @staticmethod
+    def identity(value):
+        return value
+
+    @staticmethod
+    def enum_name(value):
+        return ".".join(str(value).split('.')[1:]) or value
+
+    @classmethod
+    def lattice_parameters(cls, value):
+        return dict(zip(cls.LATTICE_PARAMETERS, (float(v) for v in value)))
+
+    @staticmethod
+    def source(value):
+        return "/".join(re.split(r'[/\\]', value)[-5:])
+
+    @classmethod
+    def serialise_all(cls, objs):
+        return [cls.serialise(obj) for obj in frozenset(objs)]
+
+    @classmethod
+    def serialise_sequence(cls, values):
+        return [cls.converter(type(value))(value) for value in values]
+
+    @classmethod
+    def serialise_mapping(cls, mapping):
+        return {key: cls.converter(type(value))(value)
+                for key, value in mapping.items()}
 
     @classmethod
     def serialise(cls, obj):
         """Serialise `obj` to JSON compatible types, calls recursively."""
-        data = cls.get_attributes(obj)
-
-        for key in ('lattice_system', 'centering'):
-            if key in data:
-                data[key] = \
-                    ".".join(str(data[key]).split('.')[1:]) or data[key]
-
-        if 'lattice_parameters' in data:
-            data['lattice_parameters'] = \
-                dict(zip(('a', 'b', 'c', 'α', 'β', 'γ'),
-                         data['lattice_parameters']))
-
-        if 'element_full' in data and 'element' in data:
-            data.pop('element_full')
-            data.pop('element')
-
-        if 'lattice_vectors' in data:
-            data['lattice_vectors'] = \
-                [list(val) for val in data['lattice_vectors']]
-
-        # convert arrays
-        data.update({k: str(v) for k, v in data.items()
-                     if isinstance(v, (crystals.ElectronicStructure,
-                                       crystals.CenteringType))})
-        data.update({k: cls.serialise(v) for k, v in data.items()
-                     if isinstance(v, crystals.Lattice)})
-        data.update({k: v.tolist() for k, v in data.items()
-                     if isinstance(v, np.ndarray)})
-        data.update({k: frozenset(v) for k, v in data.items()
-                     if isinstance(v, types.GeneratorType)})
-
-        data.update({k: [cls.serialise(vi) for vi in v]
-                     for k, v in data.items() if isinstance(v, frozenset)})
-
-        if 'source' in data:
-            data['source'] = "/".join(re.split(r'[/\\]', data['source'])[-5:])
+        converter = cls.converter
+        data = {}
+        for attr, convert in cls.plan(obj):
+            value = getattr(obj, attr)
+            if convert is None:
+                convert = converter(type(value))
+            data[attr] = None if value is None else convert(value)
 
         if isinstance(obj, crystals.Crystal):
-            data['symmetry'] = cls.serialise(obj.symmetry())
-
+            space_group = cls.serialise_mapping(symmetry(obj) or {})
+            for attr in cls.SYMMETRY_ATTRIBUTES:
+                data[attr] = space_group.get(attr)
+            data['symmetry'] = space_group
         return data
 
 
-def serialise_crystals_data():
-    """Serialise entire crystals package database."""
-    crystal_data = {}
-    with tqdm(tuple(crystals.Crystal.builtins)) as progress_bar:
-        for name in progress_bar:
-            progress_bar.set_description(f'Processing Crystal {name}...')
-            crystal = crystals.Crystal.from_database(name)
-            crystal_data[name] = CrystalSerialiser.serialise(crystal)
+def _benchmark_serialise(names, repeat):
+    """Best time of `repeat` runs serialising the crystals `names`."""
+    structures = [crystals.Crystal.from_database(name) for name in names]
+    best = float('inf')
+    for _ in range(repeat):
+        CrystalSerialiser._plans.clear()
+        CrystalSerialiser._converters.clear()
+        start = time.perf_counter()
+        for crystal in structures:
+            CrystalSerialiser.serialise(crystal)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(repeat=3):
+    """Time serialisation of every builtin crystal, printing a summary."""
+    names = sorted(crystals.Crystal.builtins)
+    best = _benchmark_serialise(names, repeat)
+    print(f"Serialised {len(names)} crystals in {best:.2f}s "
+          f"({len(names) / best:.1f} crystals/s, best of {repeat})")
+    return best
+
+
+def structure_record(name):
+    """Flat `CrystalStructure` columns of the builtin crystal `name`."""
+    crystal = crystals.Crystal.from_database(name)
+    space_group = symmetry(crystal) or {}
+    a, b, c, alpha, beta, gamma = (float(p) for p in crystal.lattice_parameters)
+    return {
+        'name': name,
+        'chemical_formula': crystal.chemical_formula,
+        'lattice_system': crystal.lattice_system.name,
+        'symmetry': space_group.get('international_symbol'),
+        'space_group_number': space_group.get('international_number'),
+        'a': a, 'b': b, 'c': c, 'α': alpha, 'β': beta, 'γ': gamma,
+        'volume': float(crystal.volume),
+        'lattice_vectors': np.array(crystal.lattice_vectors).tolist(),
+        'reciprocal_vectors': np.array(crystal.reciprocal_vectors).tolist(),
+        'atoms': sorted([atom.element, *np.asarray(atom.coords_fractional).tolist(),
+                         float(atom.occupancy)] for atom in crystal),
+    }
+
+
+def _serialise_builtin(name):
+    return name, CrystalSerialiser.serialise(crystals.Crystal.from_database(name))
+
+
+def serialise_crystals_data(processes=None):
+    """Serialise entire crystals package database using a process pool."""
+    names = sorted(crystals.Crystal.builtins)
+    with ProcessPoolExecutor(processes) as pool, \
+            tqdm(total=len(names), desc='Processing crystals') as progress_bar:
+        crystal_data = {}
+        for name, data in pool.map(_serialise_builtin, names):
+            crystal_data[name] = data
+            progress_bar.update()
     return crystal_data
 
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ['--benchmark']:
+        benchmark(*map(int, sys.argv[2:3]))
+        sys.exit()
     crystal_data = serialise_crystals_data()
     with open('crystals.json', 'w') as f:
         json.dump(crystal_data, f)
@@ -1,10 +1,74 @@
 """This module scrapes PubChem database and collects the data as json."""
 import sys
+import os
 import re
+import argparse
+import hashlib
+import glob
 import requests
 import json
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pprint import pprint
+from urllib3.util.retry import Retry
+
+from parsers.values import parse_number
+
+
+class ResponseCache:
+    """Persistent on-disk cache of raw PubChem responses.
+
+    Each response is stored as ``<atomic number>-<sha256 prefix>.json`` so a
+    recorded directory can be replayed offline and corrupted files are
+    detected by re-hashing their content.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+    def path(self, atomic_number: int, text: str) -> str:
+        return os.path.join(self.directory,
+                            f"{int(atomic_number):03d}-{self.content_hash(text)}.json")
+
+    def get(self, atomic_number: int):
+        """Return the cached response text or None if missing/corrupt."""
+        pattern = os.path.join(self.directory, f"{int(atomic_number):03d}-*.json")
+        for filename in sorted(glob.glob(pattern), key=os.path.getmtime,
+                               reverse=True):
+            with open(filename, encoding='utf-8') as f:
+                text = f.read()
+            if filename == self.path(atomic_number, text):
+                return text
+        return None
+
+    def put(self, atomic_number: int, text: str) -> str:
+        """Store `text` atomically, returning its path."""
+        filename = self.path(atomic_number, text)
+        tmp = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, filename)
+        return filename
+
+
+def make_session(pool_size: int = 8, retries: int = 5,
+                 backoff_factor: float = 0.5) -> requests.Session:
+    """Create a keep-alive session with pooled connections and retries."""
+    retry = Retry(total=retries, backoff_factor=backoff_factor,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=('GET',))
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                            pool_maxsize=pool_size,
+                                            max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 class PubChemDataParser:
@@ -12,11 +76,22 @@ class PubChemDataParser:
     DATA_CACHE = {}
 
 
-    def __init__(self, atomic_number: int):
+    def __init__(self, atomic_number: int, session=None, cache=None,
+                 url_base=None, offline=False):
         self.atomic_number = int(atomic_number)
         if self.atomic_number not in self.__class__.DATA_CACHE:
-            req = requests.get(self.URL_BASE.format(self.atomic_number))
-            self.__class__.DATA_CACHE[self.atomic_number] = json.loads(req.text.replace('Â', ''))
+            text = cache.get(self.atomic_number) if cache is not None else None
+            if text is None:
+                if offline:
+                    raise LookupError(f"No cached response for element {self.atomic_number}")
+                req = (session or requests).get(
+                    (url_base or self.URL_BASE).format(self.atomic_number),
+                    timeout=30)
+                req.raise_for_status()
+                text = req.text
+                if cache is not None:
+                    cache.put(self.atomic_number, text)
+            self.__class__.DATA_CACHE[self.atomic_number] = json.loads(text.replace('Â', ''))
 
     @property
     def data(self):
@@ -34,21 +109,18 @@ class PubChemDataParser:
                 else:
                     data = value['StringWithMarkup'][markup_idx]['String']
             except Exception as err:
-                data = f"{np.mean(eval(str(value['Number'])))} {value['Unit']}"
+                data = f"{np.mean(value['Number'])} {value['Unit']}"
             if evaluate:
-                try:
-                    data = eval(str(data))  # convert if possible
-                except:
-                    pass
+                number = parse_number(data)  # convert if possible
+                data = data if number is None else number
             return data if not isinstance(data, str) else data.strip()
 
         def cast(x):
-            try:
-                return np.mean(eval(re.sub('\([0-9A-Za-z]{1,}\)',
-                                           '', str(x).replace(' ', ''))))
-            except:
+            value = parse_number(x)
+            if value is None:
                 print(f"Unable to cast {x!r}", file=sys.stderr)
                 return None if str(x).replace(' ', '') == '' else x
+            return value
 
         section_mapping = {
             "Element Symbol": "symbol",
@@ -167,15 +239,53 @@ class PubChemDataParser:
         return data
 
 
+def harvest(atomic_numbers=range(1, 119), concurrency: int = 8,
+            cache_dir: str = None, url_base: str = None,
+            offline: bool = False):
+    """Fetch and parse elements concurrently, returning (elements, errors).
+
+    Responses are read from (and written to) `cache_dir` when given, so a
+    second harvest, or one with `offline` set, needs no network at all.
+    """
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    session = None if offline else make_session(pool_size=concurrency)
+
+    def parse(atomic_number):
+        return PubChemDataParser(atomic_number, session=session, cache=cache,
+                                 url_base=url_base, offline=offline).parse_data()
+
+    elements, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(parse, i): i for i in atomic_numbers}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                elements[i] = future.result()
+                print(f"Parsed element {i}")
+            except Exception as err:
+                errors[i] = err
+                print(f"Could not parse element {i} due to {err!r}",
+                      file=sys.stderr)
+    if session is not None:
+        session.close()
+    return dict(sorted(elements.items())), errors
+
+
 if __name__ == "__main__":
     # collect data and output elements.json
-    elements = {}
-    for i in range(1, 119):
-        try:
-            elements[i] = PubChemDataParser(i).parse_data()
-            print(f"Parsed element {i}")
-        except Exception as err:
-            print(f"Could not parse element {i} due to {err!r}",
-                  file=sys.stderr)
-    with open('elements.json', 'w') as f:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-o', '--output', default='elements.json')
+    parser.add_argument('-j', '--concurrency', type=int, default=8)
+    parser.add_argument('--cache-dir', default='pubchem_cache',
+                        help='directory of raw responses ("" to disable)')
+    parser.add_argument('--url-base', default=None,
+                        help='alternative endpoint, e.g. a local stub server')
+    parser.add_argument('--offline', action='store_true',
+                        help='only re-parse responses already in --cache-dir')
+    args = parser.parse_args()
+
+    elements, _ = harvest(concurrency=args.concurrency,
+                          cache_dir=args.cache_dir or None,
+                          url_base=args.url_base, offline=args.offline)
+    with open(args.output, 'w') as f:
         json.dump(elements, f)
@@ -0,0 +1,230 @@
+"""Eval-free parsing of the numeric values and units found in scraped data.
+
+All grammars are compiled once at import time. Values may look like::
+
+    "1.00782503223 ± 0.00000000009"   value ± uncertainty
+    "1.00794(7)"                      concise uncertainty
+    "1.2-1.5 g/cm³"                   range (mean, half-width)
+    "[209]"                           bracketed mass number
+    "1.40×10^3 mg/kg"                 scientific notation
+    "-259.16 °C (predicted)"          footnotes are dropped
+
+Use `parse_quantity` for single values and `parse_quantities` to process
+a whole column at once into NumPy arrays.
+"""
+import re
+import sys
+import json
+import time
+
+from collections import namedtuple
+
+import numpy as np
+
+Quantity = namedtuple('Quantity', ('value', 'uncertainty', 'unit'))
+
+
+def _number(name):
+    """Pattern for a decimal number with optional ``×10^n`` exponent."""
+    return (rf'(?P<{name}>[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)'
+            rf'(?:\s*[×x*]\s*10\s*\^\s*(?P<{name}_exp>[-+]?\d+))?')
+
+
+QUANTITY_RE = re.compile(
+    rf'^{_number("value")}'
+    r'(?:\((?P<concise>\d+)\))?'
+    rf'(?:\s*(?:±|\+/-)\s*{_number("uncertainty")})?'
+    rf'(?:\s*(?:-|–|—|to)\s*{_number("upper")})?'
+    r'\s*(?P<unit>[^\d\s].*?)?\s*$')
+LIST_RE = re.compile(r'^\s*[-+\d.]+(?:\s*,\s*[-+\d.]+)+\s*$')
+BRACKETED_RE = re.compile(r'^\s*[\(\[]\s*([^\)\]]+?)\s*[\)\]]\s*$')
+FOOTNOTE_RE = re.compile(r'\s*[\(\[][^\)\]]*[A-Za-z][^\)\]]*[\)\]]')
+COLON_PHRASE_RE = re.compile(r'[A-Za-z][A-Za-z \-]*:\s*')
+NOISE_RE = re.compile(r'(\\x[0-9a-fA-F]{2}|[~≈Â])')
+
+REPLACEMENTS = (
+    ('â\x88\x92', '-'), ('Ã\x97', '×'), ('−', '-'), ('\u2009', ' '),
+    ('\xa0', ' '),
+)
+
+# multiplicative factors to convert ``unit`` into the canonical unit
+UNIT_FACTORS = {
+    'g/L': ('g/cm³', 1e-3),
+    'g/l': ('g/cm³', 1e-3),
+    'kg/m³': ('g/cm³', 1e-3),
+    'g/cm3': ('g/cm³', 1.0),
+    'Å': ('pm', 100.0),
+    'nm': ('pm', 1000.0),
+    'kJ/mol': ('eV', 1.0364269656262175e-2),
+}
+
+
+def clean(text):
+    """Remove footnotes, labels and encoding noise from `text`."""
+    text = str(text)
+    for old, new in REPLACEMENTS:
+        text = text.replace(old, new)
+    text = NOISE_RE.sub('', text)
+    bracketed = BRACKETED_RE.match(text)
+    if bracketed:
+        return bracketed.group(1)
+    text = FOOTNOTE_RE.sub('', text)
+    return COLON_PHRASE_RE.sub('', text).strip()
+
+
+def _group_value(match, name):
+    value = match.group(name)
+    if value is None:
+        return None
+    exponent = match.group(f'{name}_exp')
+    value = float(value)
+    return value * 10 ** int(exponent) if exponent else value
+
+
+def _concise_uncertainty(value_text, digits):
+    """Uncertainty from concise notation, e.g. ``1.00794(7)`` -> 7e-5."""
+    mantissa = value_text.lower().split('e')[0]
+    decimals = len(mantissa.partition('.')[2])
+    return int(digits) * 10 ** -decimals
+
+
+def parse_quantity(text):
+    """Parse `text` into a `Quantity`, or None if it holds no number."""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)) and not isinstance(text, bool):
+        return Quantity(float(text), None, None)
+
+    text = clean(text)
+    if LIST_RE.match(text):
+        values = [float(v) for v in text.split(',')]
+        return Quantity(float(np.mean(values)), None, None)
+
+    match = QUANTITY_RE.match(text)
+    if match is None:
+        return None
+
+    value = _group_value(match, 'value')
+    uncertainty = _group_value(match, 'uncertainty')
+    if match.group('concise'):
+        uncertainty = _concise_uncertainty(match.group('value'),
+                                           match.group('concise'))
+    upper = _group_value(match, 'upper')
+    if upper is not None:
+        value, uncertainty = (value + upper) / 2, abs(upper - value) / 2
+    return Quantity(value, uncertainty, match.group('unit') or None)
+
+
+def parse_number(text):
+    """Return the numeric value of `text` or None."""
+    quantity = parse_quantity(text)
+    return None if quantity is None else quantity.value
+
+
+def to_kelvin(value, unit):
+    """Convert a temperature to kelvin, returning ``(value, 'K')``."""
+    if unit in ('°C', 'ºC'):
+        return value + 273.15, 'K'
+    if unit in ('°F', 'ºF'):
+        return (value - 32) * 5 / 9 + 273.15, 'K'
+    return value, unit
+
+
+def normalise(quantity):
+    """Convert `quantity` to the canonical unit used by the models."""
+    value, uncertainty, unit = quantity
+    if unit is None:
+        return quantity
+    unit = unit.strip()
+    if value is not None:
+        value, temperature_unit = to_kelvin(value, unit)
+        if temperature_unit != unit:
+            return Quantity(value, uncertainty, temperature_unit)
+    if unit in UNIT_FACTORS:
+        unit, factor = UNIT_FACTORS[unit]
+        value = value * factor
+        uncertainty = None if uncertainty is None else uncertainty * factor
+    return Quantity(value, uncertainty, unit)
+
+
+def split_unit(text):
+    """Return ``(value, unit)`` in canonical units, or ``(None, None)``."""
+    quantity = parse_quantity(text)
+    if quantity is None:
+        return None, None
+    quantity = normalise(quantity)
+    return quantity.value, quantity.unit
+
+
+def parse_quantities(texts, normalised=True):
+    """Parse a column of values at once.
+
+    Returns ``(values, uncertainties, units)`` where the first two are float
+    arrays with NaN for missing/unparseable entries. Repeated strings in the
+    column are only parsed once.
+    """
+    texts = list(texts)
+    values = np.full(len(texts), np.nan)
+    uncertainties = np.full(len(texts), np.nan)
+    units = [None] * len(texts)
+    parsed = {}
+    for i, text in enumerate(texts):
+        key = text if isinstance(text, (str, int, float)) else repr(text)
+        if key not in parsed:
+            quantity = parse_quantity(text)
+            if quantity is not None and normalised:
+                quantity = normalise(quantity)
+            parsed[key] = quantity
+        quantity = parsed[key]
+        if quantity is None:
+            continue
+        values[i] = quantity.value
+        if quantity.uncertainty is not None:
+            uncertainties[i] = quantity.uncertainty
+        units[i] = quantity.unit
+    return values, uncertainties, units
+
+
+def optional(value):
+    """Convert NaN (as produced by `parse_quantities`) to None."""
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def corpus_columns(elements):
+    """Collect the raw value columns of an `elements.json` mapping."""
+    columns = {}
+    for element in elements.values():
+        for key, value in element.items():
+            if isinstance(value, (str, int, float)) and key not in (
+                    'symbol', 'name', 'description', 'electron_configuration',
+                    'ground_level', 'element_classification'):
+                columns.setdefault(key, []).append(value)
+        for isotope in element.get('isotopes', {}).values():
+            for key, value in isotope.items():
+                columns.setdefault(f'isotope.{key}', []).append(value)
+    return columns
+
+
+def benchmark(path='elements.json', repeat=5):
+    """Time parsing of every value column in `path`, printing a summary."""
+    with open(path) as f:
+        columns = corpus_columns(json.load(f))
+
+    total = sum(len(column) for column in columns.values())
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = {key: parse_quantities(column)
+                   for key, column in columns.items()}
+        best = min(best, time.perf_counter() - start)
+
+    for key, (values, _, _) in sorted(results.items()):
+        parsed = int(np.count_nonzero(~np.isnan(values)))
+        print(f"{key:45s} {parsed:6d}/{len(values):<6d} parsed")
+    print(f"Parsed {total} values in {best * 1e3:.1f} ms "
+          f"({total / best:.0f} values/s, best of {repeat})")
+    return best
+
+
+if __name__ == "__main__":
+    benchmark(*sys.argv[1:2])